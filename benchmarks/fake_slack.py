@@ -0,0 +1,429 @@
+"""
+Local stand-in for the Slack Web API and Socket Mode, to load test the bot without a workspace.
+
+    python benchmarks/fake_slack.py --port 8090 --latency-ms 80 --jitter-ms 40 \\
+        --rate-limit '*=600' --rate-limit chat.update=50 --error-rate 0.01
+    SLACK_API_BASE_URL=http://localhost:8090/api/ python bot/app.py
+
+Web API methods answer after the configured latency with canned responses, 429 with a
+Retry-After header once a method exceeds its calls per minute, and {"ok": false} errors at
+the configured rate. apps.connections.open hands out a websocket on the same server, to which
+events are pushed with `FakeSlack.push` or `POST /__push` and whose acks are timed.
+`GET /__stats` returns the calls, rate limited calls, errors and ack latencies so far.
+"""
+import argparse
+import base64
+import collections
+import hashlib
+import itertools
+import json
+import math
+import random
+import socket
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+# Socket Mode envelope type of each payload type
+ENVELOPE_TYPES = {
+    "event_callback": "events_api",
+    "block_actions": "interactive",
+    "view_submission": "interactive",
+    "view_closed": "interactive",
+    "shortcut": "interactive",
+    "message_action": "interactive",
+    "block_suggestion": "interactive",
+}
+
+
+def percentiles(values: List[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": values[len(values) // 2],
+        "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        "max": values[-1],
+    }
+
+
+class RateLimiter:
+    """ Sliding window of the calls of the last minute, per method """
+
+    def __init__(self, limits: Dict[str, int]):
+        # method -> calls per minute, "*" for every other method
+        self.limits = limits
+        self._calls: Dict[str, Deque[float]] = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+
+    def retry_after(self, method: str) -> Optional[int]:
+        """ None if the call is allowed, else seconds to wait """
+        limit = self.limits.get(method, self.limits.get("*"))
+        if not limit:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            calls = self._calls[method]
+            while calls and calls[0] <= now - 60:
+                calls.popleft()
+            if len(calls) >= limit:
+                return max(1, math.ceil(calls[0] + 60 - now))
+            calls.append(now)
+        return None
+
+
+class WebSocketConnection:
+    """ Server side of one Socket Mode websocket, frames are written from any thread """
+
+    def __init__(self, sock: socket.socket, rfile):
+        self.sock = sock
+        self.rfile = rfile
+        self.closed = threading.Event()
+        self._send_lock = threading.Lock()
+
+    def send(self, opcode: int, data: bytes):
+        length = len(data)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        with self._send_lock:
+            self.sock.sendall(header + data)
+
+    def send_json(self, message: dict):
+        self.send(OPCODE_TEXT, json.dumps(message).encode())
+
+    def receive(self) -> Tuple[int, bytes]:
+        """ Next frame sent by the client, which masks them all """
+        header = self.rfile.read(2)
+        if len(header) < 2:
+            raise ConnectionError("websocket closed")
+        opcode = header[0] & 0x0F
+        length = header[1] & 0x7F
+        if length == 126:
+            length, = struct.unpack("!H", self.rfile.read(2))
+        elif length == 127:
+            length, = struct.unpack("!Q", self.rfile.read(8))
+        mask = self.rfile.read(4) if header[1] & 0x80 else b"\0\0\0\0"
+        data = self.rfile.read(length)
+        return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+
+
+class FakeSlack:
+    def __init__(self,
+                 host: str = "localhost",
+                 port: int = 8090,
+                 latency_ms: float = 0,
+                 jitter_ms: float = 0,
+                 rate_limits: Dict[str, int] = None,
+                 error_rate: float = 0,
+                 error: str = "internal_error",
+                 workspace_users: int = 1000,
+                 seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limiter = RateLimiter(rate_limits or {})
+        self.error_rate = error_rate
+        self.error = error
+        self.workspace_users = workspace_users
+        self._random = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.calls: Dict[str, int] = collections.Counter()
+        self.rate_limited: Dict[str, int] = collections.Counter()
+        self.errors: Dict[str, int] = collections.Counter()
+
+        self._connections: List[WebSocketConnection] = []
+        self._round_robin = itertools.count()
+        self._pending_acks: Dict[str, float] = {}
+        self.ack_ms: List[float] = []
+        self._all_acked = threading.Condition(self._lock)
+
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/"
+
+    def response_url(self, name: str = "fake") -> str:
+        """ response_url to put in interaction payloads, answers count as `response_url` calls """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/response/{name}"
+
+    def start(self) -> "FakeSlack":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        for connection in list(self._connections):
+            connection.closed.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "rate_limited": dict(self.rate_limited),
+                "errors": dict(self.errors),
+                "socket_mode": {
+                    "connections": len(self._connections),
+                    "pending_acks": len(self._pending_acks),
+                    "ack_ms": percentiles(self.ack_ms),
+                },
+            }
+
+    # Socket Mode
+
+    def push(self, payload: dict, envelope_type: str = None) -> str:
+        """ Send the payload to one of the connected Socket Mode clients, returns its envelope id """
+        envelope_id = str(uuid.uuid4())
+        envelope = {
+            "envelope_id": envelope_id,
+            "type": envelope_type or ENVELOPE_TYPES.get(payload.get("type"), "slash_commands"),
+            "payload": payload,
+            "accepts_response_payload": payload.get("type") != "event_callback",
+            "retry_attempt": 0,
+            "retry_reason": "",
+        }
+        with self._lock:
+            if not self._connections:
+                raise RuntimeError("No Socket Mode client connected")
+            connection = self._connections[next(self._round_robin) % len(self._connections)]
+            self._pending_acks[envelope_id] = time.perf_counter()
+        connection.send_json(envelope)
+        return envelope_id
+
+    def wait_for_connection(self, timeout: float = 10) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._connections:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def wait_for_acks(self, timeout: float = 30) -> bool:
+        with self._all_acked:
+            return self._all_acked.wait_for(lambda: not self._pending_acks, timeout)
+
+    def _acked(self, envelope_id: str):
+        with self._lock:
+            sent = self._pending_acks.pop(envelope_id, None)
+            if sent is not None:
+                self.ack_ms.append((time.perf_counter() - sent) * 1000)
+            if not self._pending_acks:
+                self._all_acked.notify_all()
+
+    def _serve_websocket(self, connection: WebSocketConnection):
+        with self._lock:
+            self._connections.append(connection)
+        try:
+            connection.send_json({"type": "hello", "num_connections": len(self._connections)})
+            while not connection.closed.is_set():
+                opcode, data = connection.receive()
+                if opcode == OPCODE_PING:
+                    connection.send(OPCODE_PONG, data)
+                elif opcode == OPCODE_TEXT:
+                    envelope_id = json.loads(data).get("envelope_id")
+                    if envelope_id:
+                        self._acked(envelope_id)
+                elif opcode == OPCODE_CLOSE:
+                    break
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._connections.remove(connection)
+
+    # Web API
+
+    def _response(self, method: str, args: dict) -> dict:
+        n = next(self._ids)
+        if method == "auth.test":
+            return {"ok": True, "url": "http://fake.slack.local/", "team": "Fake", "user": "bot",
+                    "team_id": "T0FAKE", "user_id": "U0FAKEBOT", "bot_id": "B0FAKE"}
+        if method == "apps.connections.open":
+            host, port = self.server.server_address[:2]
+            return {"ok": True, "url": f"ws://{host}:{port}/link?ticket={uuid.uuid4()}"}
+        if method.startswith("views."):
+            view = args.get("view") or {}
+            if isinstance(view, str):
+                view = json.loads(view)
+            return {"ok": True, "view": {**view, "id": f"V{n:08d}"}}
+        if method.startswith("chat."):
+            return {"ok": True, "channel": args.get("channel", "C0FAKE"), "ts": f"{time.time():.6f}"}
+        if method == "users.info":
+            user = args.get("user", "U0FAKE")
+            return {"ok": True, "user": {"id": user, "tz": "America/Los_Angeles", "tz_offset": -28800,
+                                         "profile": self._profile(user)}}
+        if method == "users.profile.get":
+            return {"ok": True, "profile": self._profile(args.get("user", "U0FAKE"))}
+        if method == "users.list":
+            start = int(args.get("cursor") or 0)
+            end = min(start + int(args.get("limit") or 200), self.workspace_users)
+            return {
+                "ok": True,
+                "members": [{"id": f"U{i:08d}", "tz": "America/Los_Angeles", "profile": self._profile(f"U{i:08d}")}
+                            for i in range(start, end)],
+                "response_metadata": {"next_cursor": str(end) if end < self.workspace_users else ""},
+            }
+        if method == "conversations.members":
+            # Every channel holds the whole workspace
+            start = int(args.get("cursor") or 0)
+            end = min(start + int(args.get("limit") or 100), self.workspace_users)
+            return {
+                "ok": True,
+                "members": [f"U{i:08d}" for i in range(start, end)],
+                "response_metadata": {"next_cursor": str(end) if end < self.workspace_users else ""},
+            }
+        return {"ok": True}
+
+    @staticmethod
+    def _profile(user: str) -> dict:
+        return {"display_name": user, "real_name": user,
+                **{f"image_{size}": f"https://fake.slack.local/avatars/{user}_{size}.png" for size in (24, 32, 48, 72)}}
+
+    def _handle_api(self, method: str, args: dict) -> Tuple[int, dict, dict]:
+        """ status, body and headers of the answer to a Web API call """
+        with self._lock:
+            self.calls[method] += 1
+
+        retry_after = self.rate_limiter.retry_after(method)
+        if retry_after is not None:
+            with self._lock:
+                self.rate_limited[method] += 1
+            return 429, {"ok": False, "error": "ratelimited"}, {"Retry-After": str(retry_after)}
+
+        delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            with self._lock:
+                self.errors[method] += 1
+            return 200, {"ok": False, "error": self.error}, {}
+        return 200, self._response(method, args), {}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict, headers: dict = None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _read_args(self) -> dict:
+                url = urlparse(self.path)
+                args = dict(parse_qsl(url.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    body = self.rfile.read(length).decode()
+                    if self.headers.get("Content-Type", "").startswith("application/json"):
+                        args.update(json.loads(body))
+                    else:
+                        args.update(parse_qsl(body))
+                return args
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == "/link" and self.headers.get("Upgrade", "").lower() == "websocket":
+                    accept = base64.b64encode(hashlib.sha1(
+                        (self.headers["Sec-WebSocket-Key"] + WEBSOCKET_GUID).encode()).digest()).decode()
+                    self.send_response(101)
+                    self.send_header("Upgrade", "websocket")
+                    self.send_header("Connection", "Upgrade")
+                    self.send_header("Sec-WebSocket-Accept", accept)
+                    self.end_headers()
+                    self.wfile.flush()
+                    fake._serve_websocket(WebSocketConnection(self.connection, self.rfile))
+                    self.close_connection = True
+                elif path == "/__stats":
+                    self._send_json(200, fake.stats())
+                else:
+                    self.do_POST()
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                args = self._read_args()
+                if path == "/__push":
+                    try:
+                        self._send_json(200, {"ok": True, "envelope_id": fake.push(args["payload"], args.get("type"))})
+                    except RuntimeError as e:
+                        self._send_json(409, {"ok": False, "error": str(e)})
+                elif path.startswith("/api/"):
+                    self._send_json(*fake._handle_api(path[len("/api/"):], args))
+                elif path.startswith("/response/"):
+                    status, body, headers = fake._handle_api("response_url", args)
+                    self._send_json(status, {"ok": body["ok"]}, headers)
+                else:
+                    self._send_json(404, {"ok": False, "error": "unknown_method"})
+
+        return Handler
+
+
+def parse_rate_limits(values: List[str]) -> Dict[str, int]:
+    res = {}
+    for value in values:
+        method, _, limit = value.partition("=")
+        res[method] = int(limit)
+    return res
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0, help="random extra latency, up to this")
+    parser.add_argument("--rate-limit", action="append", default=[], metavar="METHOD=PER_MINUTE",
+                        help="calls per minute of a method, * for every other method")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of the calls failing with --error")
+    parser.add_argument("--error", default="internal_error")
+    parser.add_argument("--workspace-users", type=int, default=1000, help="members returned by users.list")
+    args = parser.parse_args()
+
+    fake_slack = FakeSlack(
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limits=parse_rate_limits(args.rate_limit),
+        error_rate=args.error_rate,
+        error=args.error,
+        workspace_users=args.workspace_users,
+    )
+    print(f"Fake Slack Web API on {fake_slack.base_url}")
+    try:
+        fake_slack.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
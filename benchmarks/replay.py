@@ -0,0 +1,110 @@
+"""
+Replay of requests captured with SLACK_CAPTURE_PATH (see bot/capture.py) against a local build
+of the bot, signed again with its signing secret.
+
+    SLACK_SIGNING_SECRET=local SLACK_API_BASE_URL=http://localhost:8090/api/ python bot/app.py
+    python benchmarks/replay.py capture.ndjson --url http://localhost:3000 --signing-secret local \\
+        --speed 2 --concurrency 16
+
+Requests are sent with their captured pacing divided by --speed (0 for as fast as possible),
+or at a fixed --rate per second, by at most --concurrency requests in flight.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple
+from urllib.parse import urlencode
+
+from fake_slack import percentiles
+from run import signature_headers
+
+
+def read_capture(path: str) -> Iterator[dict]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def encode_body(record: dict) -> Tuple[str, str]:
+    """ Body and content type of a captured request """
+    if "json" in record:
+        return json.dumps(record["json"]), "application/json"
+    form = {k: json.dumps(v) if isinstance(v, (dict, list)) else v for k, v in record["form"].items()}
+    return urlencode(form), "application/x-www-form-urlencoded"
+
+
+def schedule(records: List[dict], speed: float, rate: float) -> List[float]:
+    """ Offset in seconds from the start of the replay at which each record is sent """
+    if rate:
+        return [i / rate for i in range(len(records))]
+    if not speed or not records:
+        return [0.0] * len(records)
+    first = records[0]["t"]
+    return [(r["t"] - first) / speed for r in records]
+
+
+def replay(records: List[dict], url: str, signing_secret: str, speed: float = 1, rate: float = 0,
+           concurrency: int = 8) -> dict:
+    statuses = Counter()
+    latencies = []
+    lock = threading.Lock()
+
+    def send(record: dict):
+        body, content_type = encode_body(record)
+        request = urllib.request.Request(url.rstrip("/") + record["path"], data=body.encode(),
+                                         headers=signature_headers(body, content_type, signing_secret))
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as resp:
+                resp.read()
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except urllib.error.URLError:
+            status = "unreachable"
+        with lock:
+            statuses[status] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for record, offset in zip(records, schedule(records, speed, rate)):
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, record)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(records),
+        "requests_per_second": len(records) / elapsed if elapsed else 0.0,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "latency_ms": percentiles(latencies),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="NDJSON file written with SLACK_CAPTURE_PATH")
+    parser.add_argument("--url", default="http://localhost:3000")
+    parser.add_argument("--signing-secret", required=True, help="signing secret of the local build")
+    parser.add_argument("--speed", type=float, default=1, help="pacing speed-up, 0 for as fast as possible")
+    parser.add_argument("--rate", type=float, default=0, help="fixed requests per second, overrides --speed")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", default="-", help="JSON file to write, - for stdout")
+    args = parser.parse_args()
+
+    report = replay(list(read_capture(args.capture)), args.url, args.signing_secret,
+                    speed=args.speed, rate=args.rate, concurrency=args.concurrency)
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
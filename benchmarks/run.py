@@ -0,0 +1,222 @@
+"""
+Benchmarks of the scheduling hot paths against a synthetic workspace (see workspace.py).
+
+    python benchmarks/run.py --db /tmp/workspace.db --users 10000 --slots-per-user 100 --output results.json
+
+The workspace is generated on first use and reused by later runs of the same size. Results
+are written as JSON, one entry per benchmark with timings in milliseconds, for comparison
+between releases. Slack Web API calls made by the dispatched listeners are answered in
+process, so the dispatch benchmarks measure the bot alone.
+"""
+import argparse
+import datetime
+import hashlib
+import hmac
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+from unittest import mock
+from urllib.parse import quote
+
+from workspace import BOT_DIR, open_workspace, slack_uid
+
+import pytz  # noqa: E402
+from slack_bolt import App, BoltRequest  # noqa: E402
+from slack_sdk import WebClient  # noqa: E402
+from slack_sdk.web import SlackResponse  # noqa: E402
+
+from app import SlackBotApp  # noqa: E402
+from config import SlackBotConfig  # noqa: E402
+from db.models import User, UserProfile  # noqa: E402
+from scheduling.intervals import TimeSlotIndex  # noqa: E402
+from scheduling.suggestions import suggest_meeting_times  # noqa: E402
+from views.home import HomeView  # noqa: E402
+from views.users import SetProfileModal  # noqa: E402
+
+SIGNING_SECRET = "benchmark"
+
+
+def measure(func: Callable[[int], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """ Timings of func(i) for i in range(repeat), in milliseconds """
+    for i in range(warmup):
+        func(i)
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        func(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "repeat": repeat,
+        "mean": statistics.mean(timings),
+        "p50": timings[len(timings) // 2],
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "min": timings[0],
+        "max": timings[-1],
+    }
+
+
+# (method, arguments) of the Web API calls answered by fake_api_call
+api_calls: List[Tuple[str, dict]] = []
+
+
+def fake_api_call(client: WebClient, api_method: str, **kwargs) -> SlackResponse:
+    api_calls.append((api_method, kwargs))
+    data = {"ok": True}
+    if api_method == "auth.test":
+        data.update(user_id="UBENCHBOT", team_id="TBENCH", bot_id="BBENCH")
+    elif api_method == "conversations.members":
+        data["members"] = []
+    return SlackResponse(client=client, http_verb="POST", api_url=api_method, req_args={}, data=data,
+                         headers={}, status_code=200)
+
+
+def signature_headers(body: str, content_type: str, secret: str = SIGNING_SECRET) -> Dict[str, str]:
+    """ Headers of a request from Slack with the given body, signed with secret """
+    timestamp = str(int(time.time()))
+    signature = "v0=" + hmac.new(secret.encode(), f"v0:{timestamp}:{body}".encode(), hashlib.sha256).hexdigest()
+    return {
+        "content-type": content_type,
+        "x-slack-request-timestamp": timestamp,
+        "x-slack-signature": signature,
+    }
+
+
+def signed_body(payload: dict, form: bool = True) -> Tuple[str, Dict[str, str]]:
+    """ Body and headers of a request from Slack, signed with SIGNING_SECRET """
+    body = "payload=" + quote(json.dumps(payload)) if form else json.dumps(payload)
+    return body, signature_headers(body, "application/x-www-form-urlencoded" if form else "application/json")
+
+
+def signed_request(payload: dict, form: bool = True) -> BoltRequest:
+    body, headers = signed_body(payload, form)
+    return BoltRequest(body=body, headers={name: [value] for name, value in headers.items()})
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_benchmarks(db_path: str, n_users: int, slots_per_user: int, repeat: int, seed: int = 0) -> dict:
+    open_workspace(db_path, n_users, slots_per_user, seed=seed)
+    rng = random.Random(seed)
+    results = {}
+
+    def random_uids(n: int) -> List[str]:
+        return [slack_uid(i) for i in rng.sample(range(n_users), n)]
+
+    with mock.patch.object(WebClient, "api_call", fake_api_call):
+        bot = SlackBotApp(
+            SlackBotConfig(slack_bot_token="xoxb-benchmark", slack_signing_secret=SIGNING_SECRET,
+                           db_name=db_path, log_level="WARNING"),
+            App(token="xoxb-benchmark", signing_secret=SIGNING_SECRET, process_before_response=True),
+        )
+
+        results["profile_lookup"] = measure(
+            lambda i: UserProfile.select(UserProfile, User).join(User)
+            .where(User.slack_uid == slack_uid(rng.randrange(n_users))).get(),
+            repeat * 10,
+        )
+
+        today = datetime.date.today()
+        for n_participants in (5, 50, 500):
+            n_participants = min(n_participants, n_users)
+            results[f"suggestions_{n_participants}_participants"] = measure(
+                lambda i: suggest_meeting_times(
+                    random_uids(n_participants), today, datetime.timedelta(hours=1), pytz.utc),
+                repeat,
+            )
+            # Same participants every time, so all but the warmup read the interval index
+            uids = random_uids(n_participants)
+            index = TimeSlotIndex(max_age=None)
+            results[f"suggestions_{n_participants}_participants_indexed"] = measure(
+                lambda i: suggest_meeting_times(uids, today, datetime.timedelta(hours=1), pytz.utc,
+                                                timeslot_index=index),
+                repeat,
+            )
+
+        results["render_home_view"] = measure(lambda i: HomeView().to_dict(), repeat * 10)
+
+        def render_set_profile_modal(i):
+            profile = UserProfile.select(UserProfile, User).join(User) \
+                .where(User.slack_uid == slack_uid(rng.randrange(n_users))).get()
+            SetProfileModal(
+                start_time=profile.working_hours_start,
+                end_time=profile.working_hours_end,
+                working_days_magics=profile.to_magics(),
+                timezone=profile.timezone,
+                update=True,
+            ).to_dict()
+
+        results["render_set_profile_modal"] = measure(render_set_profile_modal, repeat * 10)
+
+        def dispatch(payload_factory: Callable[[int], dict], form: bool = True) -> Callable[[int], object]:
+            def run(i):
+                resp = bot.bolt_app.dispatch(signed_request(payload_factory(i), form=form))
+                assert resp.status == 200, resp.body
+            return run
+
+        def home_opened(uid: str, view: dict = None) -> dict:
+            event = {"type": "app_home_opened", "user": uid, "tab": "home"}
+            if view is not None:
+                event["view"] = view
+            return {"type": "event_callback", "team_id": "TBENCH", "event": event}
+
+        results["dispatch_app_home_opened"] = measure(
+            dispatch(lambda i: home_opened(slack_uid(rng.randrange(n_users))), form=False), repeat * 10)
+
+        # Opens of a Home tab showing the view last published, its digest in private_metadata
+        api_calls.clear()
+        dispatch(lambda i: home_opened(slack_uid(0)), form=False)(0)
+        shown = [kwargs["json"]["view"] for method, kwargs in api_calls if method == "views.publish"][-1]
+        api_calls.clear()
+        results["dispatch_app_home_opened_unchanged"] = measure(
+            dispatch(lambda i: home_opened(slack_uid(0), shown), form=False), repeat * 10)
+        assert not [method for method, _ in api_calls if method == "views.publish"], \
+            "An unchanged Home tab was published again"
+
+        results["dispatch_set_profile_action"] = measure(dispatch(lambda i: {
+            "type": "block_actions",
+            "team": {"id": "TBENCH"},
+            "user": {"id": slack_uid(rng.randrange(n_users))},
+            "trigger_id": f"trigger-{i}",
+            "actions": [{"action_id": "home_dropdown_menu_select", "type": "overflow",
+                         "selected_option": {"value": "set_profile"}}],
+        }), repeat * 10)
+
+        bot.close()
+
+    return {
+        "generated_at": datetime.datetime.now(pytz.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workspace": {"users": n_users, "slots_per_user": slots_per_user, "seed": seed},
+        "results": results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="workspace.db", help="SQLite file of the synthetic workspace")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--slots-per-user", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="JSON file to write, - for stdout")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.db, args.users, args.slots_per_user, args.repeat, seed=args.seed)
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
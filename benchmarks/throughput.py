@@ -0,0 +1,161 @@
+"""
+End-to-end throughput of the Flask and Socket Mode paths, offline: the bot runs against a
+synthetic workspace (see workspace.py) and the local fake Slack (see fake_slack.py).
+
+    python benchmarks/throughput.py --db /tmp/workspace.db --requests 500 --concurrency 16 --latency-ms 80
+
+Requests are a mix of Home tab openings and profile menu clicks from random users.
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from slack_bolt import App
+from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_sdk import WebClient
+
+from fake_slack import FakeSlack, percentiles, parse_rate_limits
+# Importing run (or workspace) puts bot/ on sys.path
+from run import SIGNING_SECRET, signed_body
+from workspace import open_workspace, slack_uid
+
+from app import SlackBotApp
+from config import SlackBotConfig
+
+
+def payloads(n: int, n_users: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    res = []
+    for i in range(n):
+        uid = slack_uid(rng.randrange(n_users))
+        if i % 2:
+            res.append({
+                "type": "block_actions",
+                "team": {"id": "T0FAKE"},
+                "user": {"id": uid},
+                "trigger_id": f"trigger-{i}",
+                "actions": [{"action_id": "home_dropdown_menu_select", "type": "overflow",
+                             "selected_option": {"value": "set_profile"}}],
+            })
+        else:
+            res.append({
+                "type": "event_callback",
+                "team_id": "T0FAKE",
+                "event": {"type": "app_home_opened", "user": uid, "tab": "home"},
+            })
+    return res
+
+
+def create_bot(db_path: str, fake_slack: FakeSlack) -> SlackBotApp:
+    config = SlackBotConfig(
+        slack_bot_token="xoxb-fake",
+        slack_app_token="xapp-fake",
+        slack_signing_secret=SIGNING_SECRET,
+        slack_api_base_url=fake_slack.base_url,
+        db_name=db_path,
+        log_level="WARNING",
+    )
+    bolt_app = App(
+        client=WebClient(token=config.slack_bot_token, base_url=config.slack_api_base_url),
+        signing_secret=config.slack_signing_secret,
+        process_before_response=True,
+    )
+    return SlackBotApp(config=config, bolt_app=bolt_app)
+
+
+def flask_throughput(bot: SlackBotApp, requests: List[dict], concurrency: int) -> dict:
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("localhost", 0, bot.create_flask_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://localhost:{server.server_port}/slack/events"
+
+    def post(payload: dict) -> float:
+        body, headers = signed_body(payload, form=payload["type"] != "event_callback")
+        started = time.perf_counter()
+        with urllib.request.urlopen(urllib.request.Request(url, data=body.encode(), headers=headers)) as resp:
+            resp.read()
+        return (time.perf_counter() - started) * 1000
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(post, requests))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+    return {"requests_per_second": len(requests) / elapsed, "latency_ms": percentiles(latencies)}
+
+
+def socket_mode_throughput(bot: SlackBotApp, fake_slack: FakeSlack, requests: List[dict], concurrency: int) -> dict:
+    handler = SocketModeHandler(bot.bolt_app, bot.config.slack_app_token, concurrency=concurrency)
+    handler.connect()
+    try:
+        if not fake_slack.wait_for_connection():
+            raise RuntimeError("The Socket Mode client did not connect")
+        started = time.perf_counter()
+        for payload in requests:
+            fake_slack.push(payload)
+        all_acked = fake_slack.wait_for_acks(timeout=max(30.0, len(requests) / 10))
+        elapsed = time.perf_counter() - started
+    finally:
+        handler.close()
+    return {
+        "requests_per_second": len(requests) / elapsed,
+        "all_acked": all_acked,
+        "ack_ms": fake_slack.stats()["socket_mode"]["ack_ms"],
+    }
+
+
+def measure_throughput(db_path: str, n_users: int, slots_per_user: int, n_requests: int, concurrency: int,
+                       fake_slack_factory: Callable[[], FakeSlack]) -> dict:
+    open_workspace(db_path, n_users, slots_per_user)
+    requests = payloads(n_requests, n_users)
+    res = {}
+    for path in ("flask", "socket_mode"):
+        fake_slack = fake_slack_factory().start()
+        try:
+            bot = create_bot(db_path, fake_slack)
+            if path == "flask":
+                res[path] = flask_throughput(bot, requests, concurrency)
+            else:
+                res[path] = socket_mode_throughput(bot, fake_slack, requests, concurrency)
+            res[path]["web_api"] = {k: v for k, v in fake_slack.stats().items() if k != "socket_mode"}
+            bot.close()
+        finally:
+            fake_slack.stop()
+    return res
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="workspace.db", help="SQLite file of the synthetic workspace")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--slots-per-user", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=80, help="latency of the fake Web API")
+    parser.add_argument("--jitter-ms", type=float, default=40)
+    parser.add_argument("--rate-limit", action="append", default=[], metavar="METHOD=PER_MINUTE")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--output", default="-", help="JSON file to write, - for stdout")
+    args = parser.parse_args()
+
+    report = measure_throughput(
+        args.db, args.users, args.slots_per_user, args.requests, args.concurrency,
+        lambda: FakeSlack(port=0, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          rate_limits=parse_rate_limits(args.rate_limit), error_rate=args.error_rate),
+    )
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
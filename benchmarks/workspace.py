@@ -0,0 +1,134 @@
+"""
+Synthetic workspace generator: users with mixed timezones, workdays and working hours, and
+their TimeSlot rows, written into a local SQLite file.
+
+    python benchmarks/workspace.py --db /tmp/workspace.db --users 10000 --slots-per-user 100
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+from typing import List
+
+BOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot")
+if BOT_DIR not in sys.path:
+    sys.path.insert(0, BOT_DIR)
+
+from peewee import Database, chunked  # noqa: E402
+
+from db.database import conn_sqlite_database  # noqa: E402
+from db.models import User, UserProfile, TimeSlot  # noqa: E402
+from db.utils import init_db_if_not  # noqa: E402
+from scheduling.bitmap import WEEKLY_TEMPLATE_BYTES, weekly_template  # noqa: E402
+from utils import to_epoch_minute  # noqa: E402
+
+TIMEZONES = [
+    "America/Los_Angeles", "America/Denver", "America/Chicago", "America/New_York", "America/Sao_Paulo",
+    "Europe/London", "Europe/Paris", "Europe/Berlin", "Europe/Moscow", "Africa/Cairo", "Asia/Dubai",
+    "Asia/Kolkata", "Asia/Shanghai", "Asia/Tokyo", "Australia/Sydney", "Pacific/Auckland",
+]
+# Workday flags of UserProfile.workdays
+WORKDAYS = [
+    1 | 2 | 4 | 8 | 16,  # Monday - Friday
+    1 | 2 | 4 | 8 | 16,
+    1 | 2 | 4 | 8 | 16,
+    64 | 1 | 2 | 4 | 8,  # Sunday - Thursday
+    1 | 2 | 4 | 8,  # Monday - Thursday
+    1 | 4 | 16,  # part time
+]
+STATUS_LABELS = ["available", "tentative", "unavailable"]
+STATUS_WEIGHTS = [2, 1, 3]
+
+BATCH_SIZE = 1000
+
+
+def slack_uid(i: int) -> str:
+    return f"U{i:08d}"
+
+
+def generate_workspace(db: Database, n_users: int, slots_per_user: int, days: int = 28, seed: int = 0) -> List[str]:
+    """ Fill db with n_users users and slots_per_user TimeSlots each over days around today. Returns the slack uids. """
+    init_db_if_not(db)
+    rng = random.Random(seed)
+    uids = [slack_uid(i) for i in range(n_users)]
+
+    with db.atomic():
+        for batch in chunked(uids, BATCH_SIZE):
+            User.insert_many([(uid,) for uid in batch], fields=[User.slack_uid]).execute()
+
+    user_ids = [user_id for user_id, in User.select(User.id).where(User.slack_uid.in_(uids)).tuples()]
+
+    profiles = []
+    for user_id in user_ids:
+        start = datetime.datetime(1900, 1, 1, rng.randint(7, 11), rng.choice([0, 30]))
+        end = start + datetime.timedelta(hours=rng.choice([6, 8, 8, 9]))
+        workdays = rng.choice(WORKDAYS)
+        profiles.append((
+            user_id,
+            rng.choice(TIMEZONES),
+            workdays,
+            start,
+            end,
+            weekly_template(workdays, start, end).to_bytes(WEEKLY_TEMPLATE_BYTES, "little"),
+        ))
+    with db.atomic():
+        for batch in chunked(profiles, BATCH_SIZE):
+            UserProfile.insert_many(batch, fields=[
+                UserProfile.user, UserProfile.timezone, UserProfile.workdays,
+                UserProfile.working_hours_start, UserProfile.working_hours_end, UserProfile.weekly_template,
+            ]).execute()
+
+    window_start = datetime.datetime.combine(datetime.date.today(), datetime.time()) - datetime.timedelta(days=days // 2)
+    window_start_minute = to_epoch_minute(window_start)
+    window_minutes = days * 24 * 60
+
+    def slots():
+        # Epoch minutes, stored as they are by EpochMinuteField
+        for user_id in user_ids:
+            for _ in range(slots_per_user):
+                start = window_start_minute + rng.randrange(0, window_minutes, 5)
+                yield (
+                    user_id,
+                    "availability",
+                    start,
+                    start + rng.randrange(15, 181, 5),
+                    rng.choices(STATUS_LABELS, STATUS_WEIGHTS)[0],
+                )
+
+    with db.atomic():
+        for batch in chunked(slots(), BATCH_SIZE):
+            TimeSlot.insert_many(batch, fields=[
+                TimeSlot.user, TimeSlot.type, TimeSlot.start, TimeSlot.end, TimeSlot.status_label,
+            ]).execute()
+
+    return uids
+
+
+def open_workspace(path: str, n_users: int, slots_per_user: int, seed: int = 0) -> Database:
+    """ The workspace database at path, generated unless it already holds n_users users """
+    db = conn_sqlite_database(path)
+    init_db_if_not(db)
+    if User.select().count() != n_users:
+        db.close()
+        os.remove(path)
+        db = conn_sqlite_database(path)
+        started = time.perf_counter()
+        generate_workspace(db, n_users, slots_per_user, seed=seed)
+        print(f"Generated {n_users} users and {n_users * slots_per_user} time slots "
+              f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return db
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="workspace.db", help="SQLite file to write, replaced if it exists")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--slots-per-user", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    open_workspace(args.db, args.users, args.slots_per_user, seed=args.seed)
@@ -1,24 +1,45 @@
+import asyncio
 import atexit
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-from peewee import Database
+from peewee import Database, OperationalError, InterfaceError
+from playhouse.pool import PooledDatabase
 from slack_bolt import App as SlackBoltApp
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_bolt.adapter.aws_lambda import SlackRequestHandler
+from slack_sdk import WebClient
 
 from config import SlackBotConfig
-from db.database import conn_sqlite_database, conn_mysql_database
+from db.database import conn_sqlite_database, conn_mysql_database, with_connection
+from db.replicas import ReplicaRouter
 from db.utils import init_db_if_not
-from middlewares import MiddlewareRegister, global_middlewares
+from logs import flush_logging, setup_logging
+from metrics import latency_metrics
+from middlewares import MiddlewareRegister, global_middlewares, latency_middlewares
 
 from listeners import ListenerRegister, listen_events, listen_commands, listen_messages, listen_actions, listen_views, \
     listen_user_flow, listen_shortcuts
 
 from runtime import SlackBotRuntime
 
-logging.basicConfig(level=logging.DEBUG)
+# Seconds a connection may sit idle before it is pinged again ahead of a request
+DB_HEALTH_CHECK_INTERVAL = 30
+
+
+def create_database(config: SlackBotConfig, db_url: str = None) -> Database:
+    if not config.db_in_prod():
+        return conn_sqlite_database(config.db_name)
+    return conn_mysql_database(
+        db_url or config.db_url,
+        pool=config.db_pool,
+        max_connections=config.db_pool_max_connections,
+        stale_timeout=config.db_pool_stale_timeout,
+        timeout=config.db_pool_timeout,
+    )
 
 
 class SlackBotApp:
@@ -29,22 +50,70 @@ class SlackBotApp:
 
         self._socket_mode_handler: Optional[SocketModeHandler] = None
         self._lambda_mode_handler: Optional[SlackRequestHandler] = None
+        self._recorder = None
 
         self.logger = None  # TODO!
 
+        self._db_checked_at = 0.0
+
+        setup_logging(
+            level="DEBUG" if config.debug else config.log_level,
+            request_sample_rate=config.log_request_sample_rate,
+            redact_fields=config.log_redact_fields,
+            max_field_length=config.log_max_field_length,
+        )
+
         # Init database
-        if not self.config.db_in_prod():
-            self.db: Database = conn_sqlite_database(config.db_name)
-        else:
-            self.db: Database = conn_mysql_database(config.db_url)
+        self.db: Database = create_database(config)
         self.init_database()
+        # Installed once the schema is migrated, the migrations read and write the primary only
+        self.replica_router: Optional[ReplicaRouter] = None
+        if config.db_in_prod() and config.db_replica_urls:
+            self.replica_router = ReplicaRouter(
+                self.db, [create_database(config, url) for url in config.db_replica_urls])
 
         self._runtime = SlackBotRuntime(self.db)
 
+        # Listeners and middlewares are written against the sync Bolt App, bridge them to the AsyncApp.
+        # Each listener run, including a lazy one, is then a request of its own for the pooled
+        # connection checkout and the replica routing.
+        self._listener_app = self.bolt_app
+        if self.config.async_mode:
+            from async_app import AsyncListenerBridge
+            listener_wrappers = []
+            if isinstance(self.db, PooledDatabase):
+                listener_wrappers.append(with_connection)
+            if self.replica_router:
+                listener_wrappers.append(self.replica_router.per_request)
+            self._listener_app = AsyncListenerBridge(
+                self.bolt_app,
+                ThreadPoolExecutor(max_workers=self.config.async_workers, thread_name_prefix="listener"),
+                listener_wrappers,
+                ack_executor=ThreadPoolExecutor(max_workers=self.config.async_ack_workers, thread_name_prefix="ack"),
+            )
+            logging.warning(
+                f"Asyncio mode: latency metrics are disabled, and at most {self.config.async_workers} lazy/event "
+                f"listeners and {self.config.async_ack_workers} acks run at once (async_workers, async_ack_workers)")
+
         # Register Slack middlewares
+        # Middlewares run on the event loop in asyncio mode, apart from the listeners they would time
+        if not self.config.async_mode:
+            latency_metrics.ack_warn_threshold_ms = self.config.ack_warn_threshold_ms
+            latency_metrics.instrument_database(self.db)
+            latency_metrics.instrument_app(self.bolt_app)
+            self.register_middlewares(
+                latency_middlewares,
+            )
         self.register_middlewares(
             global_middlewares,
         )
+        # Check a pooled connection out for each request and hand it back once the listener is done.
+        # Bolt runs listeners after the middleware chain returned, so this wraps the whole dispatch.
+        if isinstance(self.db, PooledDatabase) and not self.config.async_mode:
+            self.bolt_app.dispatch = with_connection(self.bolt_app.dispatch)
+        # Reads go to a replica until the request writes
+        if self.replica_router and not self.config.async_mode:
+            self.bolt_app.dispatch = self.replica_router.per_request(self.bolt_app.dispatch)
 
         # Register Slack event listeners
         self.register_listeners(
@@ -60,15 +129,16 @@ class SlackBotApp:
     # Global registration of listeners for each event type/business category
     def register_listeners(self, *listener_register: ListenerRegister):
         for register in listener_register:
-            register(self.bolt_app, self._runtime)
+            register(self._listener_app, self._runtime)
 
     def register_middlewares(self, *middleware_register: MiddlewareRegister):
         for register in middleware_register:
-            register(self.bolt_app)
+            register(self._listener_app)
 
     def init_database(self):
         assert self.db
-        self.db.connect()
+        self.db.connect(reuse_if_open=True)
+        self._db_checked_at = time.monotonic()
 
         init_db_if_not(self.db)
 
@@ -77,81 +147,143 @@ class SlackBotApp:
 
     # Start/Close mode for server-ful modes, e.g. local WS based testing
     def start(self, socket_mode=False):
-        if socket_mode:
+        if self.config.async_mode:
+            self.start_async(socket_mode)
+        elif socket_mode:
             self._socket_mode_handler = SocketModeHandler(self.bolt_app, self.config.slack_app_token)
             self._socket_mode_handler.start()
         else:
-            from flask import Flask, request
-            from slack_bolt.adapter.flask import SlackRequestHandler
+            logging.debug("Starting slack bot app within flask...")
+            # Run `ngrok http 3000` to establish a tunnel
+            self.create_flask_app().run(debug=True, port=3000)
 
-            flask_app = Flask(__name__)
-            handler = SlackRequestHandler(self.bolt_app)
+    def create_flask_app(self):
+        from flask import Flask, request, jsonify
+        from slack_bolt.adapter.flask import SlackRequestHandler
 
-            @flask_app.route("/slack/events", methods=["POST"])
-            def slack_events():
-                return handler.handle(request)
+        flask_app = Flask(__name__)
+        handler = SlackRequestHandler(self.bolt_app)
 
-            @flask_app.route("/slack/interactive-endpoint", methods=["POST"])
-            def slack_interactive():
-                return handler.handle(request)
+        if self.config.capture_path:
+            from capture import RequestRecorder
 
-            @flask_app.after_request
-            def after(response):
-                logging.debug(response.status)
-                logging.debug(response.headers)
-                logging.debug(response.get_data())
-                return response
+            self._recorder = RequestRecorder(self.config.capture_path, self.config.log_redact_fields)
 
             @flask_app.before_request
-            def before():
-                logging.debug(request.headers)
-                logging.debug(request.get_data())
-                pass
+            def capture():
+                if request.method == "POST":
+                    # Flask caches the body, the handler reads it again
+                    self._recorder.record(request.path, request.content_type or "", request.get_data())
 
-            logging.debug("Starting slack bot app within flask...")
-            # Run `ngrok http 3000` to establish a tunnel
-            flask_app.run(debug=True, port=3000)
+        @flask_app.route("/slack/events", methods=["POST"])
+        def slack_events():
+            return handler.handle(request)
+
+        @flask_app.route("/slack/interactive-endpoint", methods=["POST"])
+        def slack_interactive():
+            return handler.handle(request)
+
+        @flask_app.route("/metrics", methods=["GET"])
+        def metrics():
+            return jsonify(latency_metrics.snapshot())
+
+        return flask_app
+
+    def start_async(self, socket_mode=False):
+        if socket_mode:
+            from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+
+            self._socket_mode_handler = AsyncSocketModeHandler(self.bolt_app, self.config.slack_app_token)
+            asyncio.run(self._socket_mode_handler.start_async())
+        else:
+            from aiohttp import web
+
+            server = self.bolt_app.server(port=3000, path="/slack/events")
+            server.web_app.add_routes([web.post("/slack/interactive-endpoint", server.handle_post_requests)])
+
+            logging.debug("Starting slack bot app within aiohttp...")
+            server.start()
 
     def close(self):
-        if self._socket_mode_handler:
+        if self._socket_mode_handler and not self.config.async_mode:
             self._socket_mode_handler.close()
+        if self._recorder:
+            self._recorder.close()
         self.db.close()
+        if isinstance(self.db, PooledDatabase):
+            self.db.close_all()
+        if self.replica_router:
+            self.replica_router.close()
+
+    # Reconnect if the connection went away while idle, e.g. MySQL wait_timeout while a Lambda
+    # container was frozen between invocations
+    def ensure_db_connection(self):
+        if self.db.is_closed():
+            self.db.connect()
+        elif time.monotonic() - self._db_checked_at > DB_HEALTH_CHECK_INTERVAL:
+            # Checks the primary, not a replica the read would be routed to
+            execute_sql = self.replica_router.primary_execute_sql if self.replica_router else self.db.execute_sql
+            try:
+                execute_sql("SELECT 1")
+            except (OperationalError, InterfaceError):
+                logging.warning("Database connection lost, reconnecting...")
+                try:
+                    self.db.close()
+                except (OperationalError, InterfaceError):
+                    pass
+                self.db.connect()
+        self._db_checked_at = time.monotonic()
 
     def start_lambda(self, event, context):
-        lambda_mode_handler = SlackRequestHandler(self.bolt_app)
-        return lambda_mode_handler.handle(event, context)
+        if not self._lambda_mode_handler:
+            self._lambda_mode_handler = SlackRequestHandler(self.bolt_app)
+        self.ensure_db_connection()
+        # The container may be frozen once the response is returned, listeners leave no work queued
+        # behind and do what is left after their ack in lazy listeners, run as invocations of their own
+        try:
+            return self._lambda_mode_handler.handle(event, context)
+        finally:
+            flush_logging()
+
+
+# Kept at module level so warm invocations of the same Lambda container reuse the app, its
+# listeners and its database connection
+_lambda_app: Optional[SlackBotApp] = None
+
+
+def get_lambda_app() -> SlackBotApp:
+    global _lambda_app
+    if _lambda_app is None:
+        app_config = SlackBotConfig.from_env()
+        bolt_app = SlackBoltApp(
+            client=WebClient(token=app_config.slack_bot_token, base_url=app_config.slack_api_base_url),
+            process_before_response=True,
+        )
+        _lambda_app = SlackBotApp(config=app_config, bolt_app=bolt_app)
+        logging.info("Starting slack bot app with lambda...")
+    return _lambda_app
 
 
 def lambda_handler(event, context):
-    app_config = SlackBotConfig(
-        slack_bot_token=os.environ.get("SLACK_BOT_TOKEN"),
-        slack_signing_secret=os.environ.get("SLACK_SIGNING_SECRET"),
-        db_name=os.environ.get("DB_NAME"),
-        db_hostname=os.environ.get("DB_HOSTNAME"),
-        db_username=os.environ.get("DB_USERNAME"),
-        db_password=os.environ.get("DB_PASSWORD"),
-    )
-    bolt_app = SlackBoltApp(
-        token=app_config.slack_bot_token,
-        process_before_response=True,
-    )
-
-    app = SlackBotApp(config=app_config, bolt_app=bolt_app)
-    logging.info("Starting slack bot app with lambda...")
-    return app.start_lambda(event, context)
+    return get_lambda_app().start_lambda(event, context)
 
 
 if __name__ == '__main__':
     logging.warning(msg=str(os.path.curdir))
-    _app_config = SlackBotConfig(
-        slack_bot_token=os.environ.get("SLACK_BOT_TOKEN"),
-        slack_signing_secret=os.environ.get("SLACK_SIGNING_SECRET"),
-    )
+    _app_config = SlackBotConfig.from_env()
 
-    _bolt_app = SlackBoltApp(
-        token=_app_config.slack_bot_token,
-        process_before_response=True,
-    )
+    if _app_config.async_mode:
+        from slack_bolt.async_app import AsyncApp
+        from slack_sdk.web.async_client import AsyncWebClient
+
+        _bolt_app = AsyncApp(
+            client=AsyncWebClient(token=_app_config.slack_bot_token, base_url=_app_config.slack_api_base_url),
+        )
+    else:
+        _bolt_app = SlackBoltApp(
+            client=WebClient(token=_app_config.slack_bot_token, base_url=_app_config.slack_api_base_url),
+            process_before_response=True,
+        )
     _app = SlackBotApp(config=_app_config, bolt_app=_bolt_app)
     _app.start(socket_mode=False)
 
@@ -0,0 +1,162 @@
+"""
+Asyncio serving mode: the listener groups written against the sync Bolt `App` are registered
+unchanged on a Bolt `AsyncApp`.
+
+Request handling, signature verification, ack() and every Slack Web API call run on the event
+loop with an AsyncWebClient, so one process keeps hundreds of interactions in flight while
+they wait on Slack. The sync listeners themselves (and their blocking peewee calls) run in
+thread pools, a small one for what Slack waits on to be acknowledged, and get sync stand-ins for `ack`, `say`, `respond`, `client`... that hand the
+actual I/O back to the loop.
+"""
+import asyncio
+import functools
+import inspect
+from concurrent.futures import Executor
+from typing import Any, Callable, Sequence
+
+from slack_bolt.async_app import AsyncApp
+from slack_sdk.web.async_client import AsyncWebClient
+
+
+def _is_coroutine_callable(value: Any) -> bool:
+    return inspect.iscoroutinefunction(value) or (
+        callable(value) and inspect.iscoroutinefunction(getattr(value, "__call__", None)))
+
+
+def _run_on_loop(func: Callable, loop: asyncio.AbstractEventLoop) -> Callable:
+    """ Sync stand-in for a coroutine function, to be called from a worker thread """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return asyncio.run_coroutine_threadsafe(func(*args, **kwargs), loop).result()
+
+    return wrapper
+
+
+class SyncWebClient:
+    """ Blocking facade of an AsyncWebClient for listeners running in worker threads """
+
+    def __init__(self, client: AsyncWebClient, loop: asyncio.AbstractEventLoop):
+        self._client = client
+        self._loop = loop
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if _is_coroutine_callable(attr):
+            return _run_on_loop(attr, self._loop)
+        return attr
+
+
+class AsyncListenerBridge:
+    """
+    Decorator API of the sync Bolt `App` (event, action, view, use...) on top of an AsyncApp.
+
+    Listeners are run in worker threads, each wrapped by listener_wrappers, e.g. to check a pooled
+    connection out for the run. Whatever Slack waits on to be acknowledged runs in ack_executor:
+    the ack functions of ack/lazy pairs and the listeners calling ack() themselves, which are
+    expected to be short (long work goes to lazy listeners). Lazy listeners and the event and
+    message listeners, which Bolt acknowledges on its own, run in executor, so they cannot hold
+    the acks of other requests back however long they wait on Slack or the database.
+
+    Middlewares are run on the event loop before the listener, so they must not block, and
+    anything they do after next() happens once the listener has been started rather than once
+    it is done.
+    """
+
+    def __init__(self, app: AsyncApp, executor: Executor, listener_wrappers: Sequence[Callable] = (),
+                 ack_executor: Executor = None):
+        self.app = app
+        self.executor = executor
+        self.ack_executor = ack_executor or executor
+        self.listener_wrappers = listener_wrappers
+
+    def _to_sync_kwargs(self, kwargs: dict, loop: asyncio.AbstractEventLoop) -> dict:
+        res = {}
+        for name, value in kwargs.items():
+            if isinstance(value, AsyncWebClient):
+                value = SyncWebClient(value, loop)
+            elif _is_coroutine_callable(value):
+                value = _run_on_loop(value, loop)
+            res[name] = value
+        return res
+
+    def _wrap_listener(self, func: Callable, executor: Executor) -> Callable:
+        run = func
+        for wrap in self.listener_wrappers:
+            run = wrap(run)
+
+        # functools.wraps keeps the signature Bolt reads to inject the listener arguments
+        @functools.wraps(func)
+        async def listener(**kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                executor, functools.partial(run, **self._to_sync_kwargs(kwargs, loop)))
+
+        return listener
+
+    def _wrap_middleware(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def middleware(**kwargs):
+            next_ = kwargs.get("next")
+            called = []
+
+            def sync_next():
+                called.append(True)
+
+            if next_ is not None:
+                kwargs["next"] = sync_next
+            res = func(**kwargs)
+            if called:
+                return await next_()
+            return res
+
+        return middleware
+
+    def _wrap_error_handler(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def error_handler(**kwargs):
+            return func(**kwargs)
+
+        return error_handler
+
+    def _listener(self, register: Callable, auto_acknowledged: bool = False) -> Callable:
+        # Same calling conventions as the sync decorators: @app.action(...) or app.action(...)(ack=f, lazy=[g])
+        def decorator(*functions, ack: Callable = None, lazy: list = None):
+            if ack is not None:
+                register(ack=self._wrap_listener(ack, self.ack_executor),
+                         lazy=[self._wrap_listener(f, self.executor) for f in lazy or []])
+                return ack
+            executor = self.executor if auto_acknowledged else self.ack_executor
+            register(self._wrap_listener(functions[0], executor))
+            return functions[0]
+
+        return decorator
+
+    def use(self, func: Callable) -> Callable:
+        self.app.use(self._wrap_middleware(func))
+        return func
+
+    def error(self, func: Callable) -> Callable:
+        self.app.error(self._wrap_error_handler(func))
+        return func
+
+    def event(self, *args, **kwargs):
+        return self._listener(self.app.event(*args, **kwargs), auto_acknowledged=True)
+
+    def message(self, *args, **kwargs):
+        return self._listener(self.app.message(*args, **kwargs), auto_acknowledged=True)
+
+    def command(self, *args, **kwargs):
+        return self._listener(self.app.command(*args, **kwargs))
+
+    def shortcut(self, *args, **kwargs):
+        return self._listener(self.app.shortcut(*args, **kwargs))
+
+    def action(self, *args, **kwargs):
+        return self._listener(self.app.action(*args, **kwargs))
+
+    def view(self, *args, **kwargs):
+        return self._listener(self.app.view(*args, **kwargs))
+
+    def options(self, *args, **kwargs):
+        return self._listener(self.app.options(*args, **kwargs))
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+logger = logging.getLogger(__name__)
+
+
+class SlackProfileCache:
+    """
+    Shared TTL + LRU cache of Slack user profiles (users.profile.get), mostly for avatars.
+
+    Missing profiles are fetched concurrently by at most max_workers threads, and refreshed
+    from user_change events with `update` instead of waiting for their TTL.
+    """
+
+    def __init__(self, max_users: int = 5000, ttl: float = 3600, max_workers: int = 8):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.max_workers = max_workers
+
+        # slack uid -> (profile, monotonic time fetched)
+        self._profiles: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        # slack uid -> set once the profile being fetched is cached
+        self._fetching: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def _get_cached(self, user_id: str) -> Optional[dict]:
+        with self._lock:
+            cached = self._profiles.get(user_id)
+            if cached is None:
+                return None
+            profile, fetched_at = cached
+            if time.monotonic() - fetched_at >= self.ttl:
+                del self._profiles[user_id]
+                return None
+            self._profiles.move_to_end(user_id)
+            return profile
+
+    def update(self, user_id: str, profile: dict):
+        with self._lock:
+            self._profiles[user_id] = (profile, time.monotonic())
+            self._profiles.move_to_end(user_id)
+            while len(self._profiles) > self.max_users:
+                self._profiles.popitem(last=False)
+
+    def invalidate(self, user_id: str = None):
+        with self._lock:
+            if user_id is None:
+                self._profiles.clear()
+            else:
+                self._profiles.pop(user_id, None)
+
+    def _fetch(self, client: WebClient, user_id: str) -> Optional[dict]:
+        # Concurrent misses of the same user wait for the call of the first one instead of making their own
+        with self._lock:
+            fetching = self._fetching.get(user_id)
+            if fetching is None:
+                self._fetching[user_id] = threading.Event()
+        if fetching is not None:
+            fetching.wait()
+            return self._get_cached(user_id)
+
+        try:
+            profile = client.users_profile_get(user=user_id)["profile"]
+            self.update(user_id, profile)
+            return profile
+        except SlackApiError as e:
+            logger.warning(f"Could not fetch the profile of {user_id}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._fetching.pop(user_id).set()
+
+    def get_many(self, client: WebClient, user_ids: Iterable[str]) -> Dict[str, dict]:
+        """ Profiles of the given users, fetching the missing ones in parallel. Unknown users are left out. """
+        res = {}
+        missing = []
+        for uid in dict.fromkeys(user_ids):
+            profile = self._get_cached(uid)
+            if profile is None:
+                missing.append(uid)
+            else:
+                res[uid] = profile
+
+        if len(missing) == 1:
+            fetched = [self._fetch(client, missing[0])]
+        elif missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as executor:
+                fetched = list(executor.map(lambda uid: self._fetch(client, uid), missing))
+        else:
+            fetched = []
+
+        for uid, profile in zip(missing, fetched):
+            if profile is not None:
+                res[uid] = profile
+        return res
+
+    def get(self, client: WebClient, user_id: str) -> Optional[dict]:
+        return self.get_many(client, [user_id]).get(user_id)
+
+    def avatar_urls(self, client: WebClient, user_ids: Iterable[str], size: int = 24) -> Dict[str, str]:
+        """ slack uid -> url of the avatar image of the given size (24, 32, 48, 72...) """
+        return {
+            uid: profile[f"image_{size}"]
+            for uid, profile in self.get_many(client, user_ids).items()
+            if profile.get(f"image_{size}")
+        }
+
+
+class HomeTabCache:
+    """
+    Per-user LRU cache of the last rendered Home tab and its digest.
+
+    An entry is keyed on the data the view was rendered from, as read from the database, so a
+    change made by another process or container is a different key. An unchanged key skips
+    rendering and hashing the view again.
+    """
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+
+        # slack uid -> (key, view, digest)
+        self._entries: "OrderedDict[str, Tuple[Hashable, dict, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, key: Hashable) -> Optional[Tuple[dict, str]]:
+        """ (view, digest) rendered for the key, if it is the user's last render """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != key:
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1], entry[2]
+
+    def put(self, user_id: str, key: Hashable, view: dict, digest: str):
+        with self._lock:
+            self._entries[user_id] = (key, view, digest)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
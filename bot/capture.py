@@ -0,0 +1,67 @@
+"""
+Capture of the requests received from Slack into an NDJSON file, to replay production traffic
+shapes against a local build (see benchmarks/replay.py).
+
+Each line holds the request's offset in seconds from the start of the capture, its path and
+its parsed body: `json` for Events API requests, `form` for interactions and slash commands
+(with the `payload` field decoded). Fields listed in redact_fields are masked and the
+signature headers are dropped, the replay signs the requests again with a local secret.
+Requests are written by a background thread.
+"""
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl
+
+from logs import redact
+
+logger = logging.getLogger(__name__)
+
+
+def parse_body(content_type: str, raw_body: bytes) -> dict:
+    text = raw_body.decode("utf-8")
+    if content_type.startswith("application/json"):
+        return {"json": json.loads(text)}
+    form = dict(parse_qsl(text, keep_blank_values=True))
+    if "payload" in form:
+        form["payload"] = json.loads(form["payload"])
+    return {"form": form}
+
+
+class RequestRecorder:
+    def __init__(self, path: str, redact_fields: Iterable[str] = ()):
+        self.path = path
+        self.redact_fields = frozenset(redact_fields)
+
+        self._started = time.monotonic()
+        self._queue: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write, name="request-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, path: str, content_type: str, raw_body: bytes):
+        self._queue.put((time.monotonic() - self._started, path, content_type, raw_body))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _write(self):
+        with open(self.path, "a") as f:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                offset, path, content_type, raw_body = item
+                try:
+                    body = parse_body(content_type, raw_body)
+                except ValueError as e:
+                    logger.warning(f"Skipped capturing an unparsable request to {path}: {e}")
+                    continue
+                record = {"t": round(offset, 6), "path": path,
+                          **redact(body, self.redact_fields, max_length=sys.maxsize, max_depth=sys.maxsize)}
+                f.write(json.dumps(record) + "\n")
+                f.flush()
@@ -1,4 +1,16 @@
+import os
 from dataclasses import dataclass, field
+from typing import Tuple
+
+from slack_sdk import WebClient
+
+
+def _to_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _to_tuple(value: str) -> Tuple[str, ...]:
+    return tuple(v.strip() for v in value.split(",") if v.strip())
 
 
 @dataclass
@@ -11,12 +23,35 @@ class SlackBotConfig:
     slack_app_token: str = ""
     # Optional, token used for non-websocket mode
     slack_signing_secret: str = ""
+    # Optional, Web API endpoint, e.g. a local fake Slack for load tests (benchmarks/fake_slack.py)
+    slack_api_base_url: str = WebClient.BASE_URL
 
     """
     Runtime configs
     """
     debug: bool = False
 
+    # Level of the root logger, DEBUG in debug mode
+    log_level: str = "INFO"
+    # Share of the Slack requests logged, requests failing with an error are always logged
+    log_request_sample_rate: float = 0.1
+    # Payload fields masked in the logs, and length from which strings and lists are cut
+    log_redact_fields: Tuple[str, ...] = ("token", "response_url", "response_urls", "trigger_id", "authorizations")
+    log_max_field_length: int = 256
+
+    # Warn about listeners calling ack() later than this, Slack gives up after 3 seconds
+    ack_warn_threshold_ms: int = 2000
+
+    # Optional, NDJSON file the Flask server appends the requests it receives to, redacted of log_redact_fields
+    capture_path: str = ""
+
+    # Serve with Bolt's AsyncApp. Sync listeners then run in threads: acks and the listeners acking
+    # themselves in async_ack_workers, lazy and event listeners in async_workers, which caps the
+    # listeners running at once. The latency metrics (metrics.py) are not collected in this mode.
+    async_mode: bool = False
+    async_workers: int = 64
+    async_ack_workers: int = 16
+
     """
     Database
     """
@@ -30,6 +65,17 @@ class SlackBotConfig:
     db_username: str = ""
     db_password: str = ""
 
+    # Optional, pool the prod mysql connections and check one out per request
+    db_pool: bool = False
+    db_pool_max_connections: int = 8
+    # seconds before an idle pooled connection is recycled
+    db_pool_stale_timeout: int = 300
+    # seconds to wait for a free connection when the pool is exhausted
+    db_pool_timeout: int = 10
+
+    # Optional, mysql:// URLs of read replicas of the prod database, see db/replicas.py
+    db_replica_urls: Tuple[str, ...] = ()
+
     db_url: str = field(init=False)
 
     def __post_init__(self):
@@ -38,5 +84,36 @@ class SlackBotConfig:
         else:
             self.db_url = f"mysql://{self.db_username}:{self.db_password}@{self.db_hostname}/{self.db_name}"
 
+    @classmethod
+    def from_env(cls) -> "SlackBotConfig":
+        env_names = {
+            "slack_app_token": ("SLACK_APP_TOKEN", str),
+            "slack_signing_secret": ("SLACK_SIGNING_SECRET", str),
+            "slack_api_base_url": ("SLACK_API_BASE_URL", str),
+            "debug": ("SLACK_BOT_DEBUG", _to_bool),
+            "log_level": ("LOG_LEVEL", str),
+            "log_request_sample_rate": ("LOG_REQUEST_SAMPLE_RATE", float),
+            "log_redact_fields": ("LOG_REDACT_FIELDS", _to_tuple),
+            "log_max_field_length": ("LOG_MAX_FIELD_LENGTH", int),
+            "ack_warn_threshold_ms": ("ACK_WARN_THRESHOLD_MS", int),
+            "capture_path": ("SLACK_CAPTURE_PATH", str),
+            "async_mode": ("SLACK_BOT_ASYNC", _to_bool),
+            "async_workers": ("SLACK_BOT_ASYNC_WORKERS", int),
+            "async_ack_workers": ("SLACK_BOT_ASYNC_ACK_WORKERS", int),
+            "db_name": ("DB_NAME", str),
+            "db_hostname": ("DB_HOSTNAME", str),
+            "db_username": ("DB_USERNAME", str),
+            "db_password": ("DB_PASSWORD", str),
+            "db_pool": ("DB_POOL", _to_bool),
+            "db_pool_max_connections": ("DB_POOL_MAX_CONNECTIONS", int),
+            "db_pool_stale_timeout": ("DB_POOL_STALE_TIMEOUT", int),
+            "db_pool_timeout": ("DB_POOL_TIMEOUT", int),
+            "db_replica_urls": ("DB_REPLICA_URLS", _to_tuple),
+        }
+        return cls(
+            slack_bot_token=os.environ.get("SLACK_BOT_TOKEN"),
+            **{name: cast(os.environ[env]) for name, (env, cast) in env_names.items() if env in os.environ},
+        )
+
     def db_in_prod(self) -> bool:
         return self.db_url.startswith("mysql")
@@ -1,3 +1,6 @@
+import functools
+from typing import Callable
+
 from peewee import Database, DatabaseProxy, SqliteDatabase, MySQLDatabase
 from playhouse.db_url import connect
 
@@ -8,6 +11,24 @@ def use_database(db: Database):
     database_runtime.initialize(db)
 
 
+def with_connection(func: Callable) -> Callable:
+    """
+    Run func with a database connection for its thread, opened and closed around the call
+    unless one is open already, e.g. for lazy listeners running outside the request middlewares
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        opened = database_runtime.is_closed() and database_runtime.connect()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if opened and not database_runtime.is_closed():
+                database_runtime.close()
+
+    return wrapper
+
+
 def conn_sqlite_database(db_name: str) -> SqliteDatabase:
     return SqliteDatabase(
         db_name, pragmas={
@@ -19,9 +40,22 @@ def conn_sqlite_database(db_name: str) -> SqliteDatabase:
     )
 
 
-def conn_mysql_database(db_url: str) -> MySQLDatabase:
-    db = connect(db_url)
+def conn_mysql_database(db_url: str,
+                        pool: bool = False,
+                        max_connections: int = 8,
+                        stale_timeout: int = 300,
+                        timeout: int = 10) -> MySQLDatabase:
+    if pool:
+        # PooledMySQLDatabase, connections are per thread and returned to the pool on close()
+        db = connect(
+            db_url.replace("mysql://", "mysql+pool://", 1),
+            max_connections=max_connections,
+            stale_timeout=stale_timeout,
+            timeout=timeout,
+        )
+    else:
+        db = connect(db_url)
 
     # Boldly assume connect will make Mysql connection
-    assert type(db) is MySQLDatabase
+    assert isinstance(db, MySQLDatabase)
     return db
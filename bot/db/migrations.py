@@ -0,0 +1,206 @@
+"""
+Versioned schema migrations, applied in order and recorded in the SchemaVersion table.
+Every migration must be idempotent: a migration interrupted half way is simply rerun.
+"""
+import datetime
+import logging
+import weakref
+from typing import Callable, List, Tuple
+
+from peewee import JOIN, Database, DatabaseError, IntegrityError, MySQLDatabase, Value, fn
+from playhouse.migrate import SchemaMigrator, migrate as apply_operations
+
+from db.models import SchemaVersion, User, UserProfile, WeekDays, TimeSlot, Meeting, MeetingParticipant, \
+    UserImportState, UpcomingMeeting
+from utils import to_epoch_minute
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+
+Migration = Callable[[Database], None]
+
+
+def _create_initial_tables(db: Database):
+    db.create_tables([User, UserProfile, WeekDays, TimeSlot])
+
+
+def _create_meeting_tables(db: Database):
+    db.create_tables([Meeting, MeetingParticipant])
+
+
+def _create_user_import_state_table(db: Database):
+    db.create_tables([UserImportState])
+
+
+def _add_missing_columns(db: Database, model, *fields):
+    existing = {column.name for column in db.get_columns(model._meta.table_name)}
+    migrator = SchemaMigrator.from_database(db)
+    apply_operations(*[
+        migrator.add_column(model._meta.table_name, field.column_name, field)
+        for field in fields if field.column_name not in existing
+    ])
+
+
+def _add_missing_indexes(db: Database, model):
+    existing = {index.name for index in db.get_indexes(model._meta.table_name)}
+    for index in model._meta.fields_to_index():
+        if index._name in existing:
+            continue
+        # Checked above, MySQL has no CREATE INDEX IF NOT EXISTS
+        sql, params = db.get_sql_context().sql(index.safe(False)).query()
+        if isinstance(db, MySQLDatabase):
+            # Online DDL: the index is built in place while the table keeps serving reads and writes
+            sql += " ALGORITHM=INPLACE LOCK=NONE"
+        logger.info(f"Creating index {index._name}")
+        db.execute_sql(sql, params)
+
+
+def _add_meeting_participant_delivery_columns(db: Database):
+    _add_missing_columns(
+        db, MeetingParticipant,
+        MeetingParticipant.delivery_status,
+        MeetingParticipant.dm_channel,
+        MeetingParticipant.message_ts,
+        MeetingParticipant.delivery_error,
+        MeetingParticipant.delivered_at,
+    )
+
+
+def _add_rsvp_columns(db: Database):
+    _add_missing_columns(db, Meeting, Meeting.organizer)
+    _add_missing_columns(db, MeetingParticipant, MeetingParticipant.rsvp, MeetingParticipant.rsvp_at)
+
+
+def _create_upcoming_meeting_table(db: Database):
+    db.create_tables([UpcomingMeeting])
+    # Rebuilt from scratch, so that a rerun does not duplicate rows
+    UpcomingMeeting.delete().execute()
+    organizer = User.alias()
+    UpcomingMeeting.insert_from(
+        MeetingParticipant.select(
+            MeetingParticipant.user, Meeting.id, Meeting.title, Meeting.meeting_start, Meeting.meeting_end,
+            organizer.slack_uid, MeetingParticipant.rsvp,
+        ).join(Meeting).join(organizer, JOIN.LEFT_OUTER, on=(Meeting.organizer == organizer.id))
+        # Compared as the column held it before migration 8 turned it into epoch minutes
+        .where(Meeting.meeting_start >= Value(datetime.datetime.utcnow(), converter=str)),
+        fields=[UpcomingMeeting.user, UpcomingMeeting.meeting, UpcomingMeeting.title, UpcomingMeeting.meeting_start,
+                UpcomingMeeting.meeting_end, UpcomingMeeting.organizer_uid, UpcomingMeeting.rsvp],
+    ).execute()
+
+
+def _add_hot_path_indexes(db: Database):
+    for model in (TimeSlot, Meeting, MeetingParticipant):
+        _add_missing_indexes(db, model)
+
+
+def _epoch_minute(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return to_epoch_minute(value)
+    if isinstance(value, str):
+        # SQLite DATETIME text, e.g. "2024-05-06 09:30:00" or "2024-05-06 09:30:00+00:00"
+        return to_epoch_minute(datetime.datetime.fromisoformat(value))
+    if value >= 10 ** 13:
+        # MySQL DATETIME altered to BIGINT, YYYYMMDDhhmmss
+        return to_epoch_minute(datetime.datetime.strptime(str(value), "%Y%m%d%H%M%S"))
+    return value
+
+
+def _convert_to_epoch_minutes(db: Database, model, *fields):
+    """ Rewrite the datetimes stored in fields as epoch minutes, see EpochMinuteField """
+    if isinstance(db, MySQLDatabase):
+        types = {column.name: column.data_type for column in db.get_columns(model._meta.table_name)}
+        for field in fields:
+            if "int" not in types[field.column_name].lower():
+                db.execute_sql(f"ALTER TABLE `{model._meta.table_name}` MODIFY `{field.column_name}` BIGINT "
+                               f"{'NULL' if field.null else 'NOT NULL'}")
+    # SQLite keeps the integers in the DATETIME columns as they are
+
+    last_id = 0
+    while True:
+        rows = list(model.select(model.id, *[field.coerce(False) for field in fields])
+                    .where(model.id > last_id).order_by(model.id).limit(BACKFILL_BATCH_SIZE).tuples())
+        if not rows:
+            break
+        with db.atomic():
+            for row_id, *values in rows:
+                minutes = [_epoch_minute(value) for value in values]
+                if minutes != values:
+                    model.update(dict(zip(fields, minutes))).where(model.id == row_id).execute()
+        last_id = rows[-1][0]
+
+
+def _store_times_as_epoch_minutes(db: Database):
+    _convert_to_epoch_minutes(db, TimeSlot, TimeSlot.start, TimeSlot.end)
+    _convert_to_epoch_minutes(db, Meeting, Meeting.meeting_start, Meeting.meeting_end)
+    _convert_to_epoch_minutes(db, UpcomingMeeting, UpcomingMeeting.meeting_start, UpcomingMeeting.meeting_end)
+
+
+def _add_weekly_template_column(db: Database):
+    _add_missing_columns(db, UserProfile, UserProfile.weekly_template)
+    last_id = 0
+    while True:
+        profiles = list(UserProfile.select()
+                        .where(UserProfile.id > last_id, UserProfile.weekly_template.is_null())
+                        .order_by(UserProfile.id).limit(BACKFILL_BATCH_SIZE))
+        if not profiles:
+            break
+        with db.atomic():
+            for profile in profiles:
+                profile.update_weekly_template()
+                profile.save(only=[UserProfile.weekly_template])
+        last_id = profiles[-1].id
+
+
+def _add_rsvp_render_column(db: Database):
+    _add_missing_columns(db, Meeting, Meeting.rsvp_render_at)
+
+
+MIGRATIONS: List[Tuple[int, Migration]] = [
+    (1, _create_initial_tables),
+    (2, _create_meeting_tables),
+    (3, _create_user_import_state_table),
+    (4, _add_meeting_participant_delivery_columns),
+    (5, _add_rsvp_columns),
+    (6, _create_upcoming_meeting_table),
+    (7, _add_hot_path_indexes),
+    (8, _store_times_as_epoch_minutes),
+    (9, _add_weekly_template_column),
+    (10, _add_rsvp_render_column),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Databases known to be at SCHEMA_VERSION in this process, so warm starts skip even the version read
+_current_databases = weakref.WeakSet()
+
+
+def get_schema_version(db: Database) -> int:
+    try:
+        return SchemaVersion.select(fn.MAX(SchemaVersion.version)).scalar() or 0
+    except DatabaseError:
+        # No SchemaVersion table yet
+        return 0
+
+
+def migrate(db: Database):
+    if db in _current_databases:
+        return
+
+    version = get_schema_version(db)
+    if version < SCHEMA_VERSION:
+        db.create_tables([SchemaVersion])
+        for target, migration in MIGRATIONS:
+            if target <= version:
+                continue
+            logger.info(f"Migrating database schema to version {target}")
+            migration(db)
+            try:
+                SchemaVersion.create(version=target)
+            except IntegrityError:
+                # Applied concurrently by another process
+                pass
+
+    _current_databases.add(db)
@@ -2,10 +2,30 @@
 timezone: UTC-12 - UTC+12 -> [0,24] in db
 WeekDays: Monday - Sunday -> [0, 6]
 """
-from peewee import Model, CharField, PrimaryKeyField, BooleanField, IntegerField, DateTimeField, ForeignKeyField, \
-    BitField
+import datetime
+
+from peewee import Model, CharField, PrimaryKeyField, BooleanField, IntegerField, BigIntegerField, DateTimeField, \
+    ForeignKeyField, BitField, BlobField
 
 from db.database import database_runtime
+from scheduling.bitmap import WEEKLY_TEMPLATE_BYTES, weekly_template
+from utils import to_epoch_minute, from_epoch_minute
+
+
+class EpochMinuteField(BigIntegerField):
+    """
+    UTC time stored as minutes since the epoch, read back as an aware UTC datetime. Writes take
+    datetimes, naive ones being in UTC, or epoch minutes. Select the field with coerce(False) to
+    read the integers themselves.
+    """
+
+    def db_value(self, value):
+        if isinstance(value, datetime.datetime):
+            return to_epoch_minute(value)
+        return super().db_value(value)
+
+    def python_value(self, value):
+        return None if value is None else from_epoch_minute(int(value))
 
 
 class BaseModel(Model):
@@ -15,16 +35,32 @@ class BaseModel(Model):
     id = PrimaryKeyField()
 
 
+class SchemaVersion(BaseModel):
+    version = IntegerField(unique=True)
+    applied_at = DateTimeField(default=datetime.datetime.utcnow)
+
+
 class User(BaseModel):
     slack_uid = CharField(unique=True)
 
 
+class UserImportState(BaseModel):
+    """ Progress of the bulk import of a workspace's members, see onboarding.py """
+    team_id = CharField(unique=True)
+    cursor = CharField(null=True)  # users.list cursor of the next page to import
+    imported = IntegerField(default=0)
+    started_at = DateTimeField(default=datetime.datetime.utcnow)
+    completed_at = DateTimeField(null=True)
+
+
 class UserProfile(BaseModel):
     user = ForeignKeyField(User, backref="profile", unique=True)
     timezone = CharField()  # pytz supported timezone chars
     workdays = BitField()
     working_hours_start = DateTimeField()
     working_hours_end = DateTimeField()
+    # Working hours of the week packed by scheduling.bitmap.weekly_template, rebuilt on every change
+    weekly_template = BlobField(null=True)
 
     selected_monday = workdays.flag(1)
     selected_tuesday = workdays.flag(2)
@@ -37,6 +73,18 @@ class UserProfile(BaseModel):
     def update_workdays(self, *workdays):
         for workday in workdays:
             self.workdays |= int(workday)
+        self.update_weekly_template()
+
+    def update_weekly_template(self):
+        self.weekly_template = weekly_template(
+            self.workdays, self.working_hours_start, self.working_hours_end,
+        ).to_bytes(WEEKLY_TEMPLATE_BYTES, "little")
+
+    def weekly_bitmap(self) -> int:
+        """ weekly_template as an int, see scheduling.bitmap """
+        if self.weekly_template is None:
+            self.update_weekly_template()
+        return int.from_bytes(self.weekly_template, "little")
 
     def to_magics(self):
         res = []
@@ -57,26 +105,76 @@ class TimeSlot(BaseModel):
     type = CharField(choices=[
         "availability",
     ])
-    start = DateTimeField()
-    end = DateTimeField()
+    start = EpochMinuteField()
+    end = EpochMinuteField()
     status_label = CharField(choices=[
         "available",
         "tentative",
         "unavailable",
     ])
 
+    class Meta:
+        indexes = (
+            (("user", "start"), False),
+        )
+
 
 class Meeting(BaseModel):
     epoch = IntegerField()
     title = CharField(max_length=100)
-    meeting_start = DateTimeField(help_text="In UTC")
-    meeting_end = DateTimeField(help_text="In UTC")
+    meeting_start = EpochMinuteField(index=True)
+    meeting_end = EpochMinuteField()
     frequency = CharField()
+    organizer = ForeignKeyField(User, null=True)
+    # Due time of the pending update of the organizer's message with the latest answers, see rsvp.py
+    rsvp_render_at = DateTimeField(null=True)
 
 
 class MeetingParticipant(BaseModel):
+    user = ForeignKeyField(User)
+    meeting = ForeignKeyField(Meeting, backref="participants")
+
+    # Delivery of the invitation DM, see invitations.py
+    delivery_status = CharField(default="pending", choices=[
+        "pending",
+        "sent",
+        "failed",
+    ])
+    dm_channel = CharField(null=True)
+    message_ts = CharField(null=True)
+    delivery_error = CharField(null=True)
+    delivered_at = DateTimeField(null=True)
+
+    # Answer to the invitation, see rsvp.py
+    rsvp = CharField(null=True, choices=[
+        "yes",
+        "maybe",
+        "no",
+    ])
+    rsvp_at = DateTimeField(null=True)
+
+    class Meta:
+        indexes = (
+            (("meeting", "user"), False),
+            (("user", "meeting"), False),
+        )
+
+
+class UpcomingMeeting(BaseModel):
+    """ Meetings of a user as shown on their Home tab, maintained by upcoming.py """
     user = ForeignKeyField(User)
     meeting = ForeignKeyField(Meeting)
+    title = CharField(max_length=100)
+    meeting_start = EpochMinuteField()
+    meeting_end = EpochMinuteField()
+    organizer_uid = CharField(null=True)
+    rsvp = CharField(null=True)
+
+    class Meta:
+        indexes = (
+            (("user", "meeting_start"), False),
+            (("meeting", "user"), True),
+        )
 
 
 class MeetingOption(BaseModel):
@@ -0,0 +1,106 @@
+"""
+Read replica routing for the production MySQL database.
+
+The router takes over the primary's execute_sql: SELECTs of a request go to one of the read
+replicas, everything else to the primary. Once a request wrote, or while it is in a transaction,
+its reads stay on the primary so that it reads its own writes. The state is per thread, reset
+around each dispatched request (see SlackBotApp) and whenever the thread opens the primary.
+"""
+import functools
+import logging
+import random
+import threading
+from typing import Callable, List, Optional
+
+from peewee import Database, InterfaceError, OperationalError
+from playhouse.pool import PooledDatabase
+
+logger = logging.getLogger(__name__)
+
+READ_STATEMENTS = ("SELECT", "SHOW", "EXPLAIN")
+
+
+class _RequestState(threading.local):
+    wrote = False
+    replica: Optional[Database] = None
+
+
+def is_read(sql: str) -> bool:
+    statement = sql.lstrip()[:7].upper()
+    return statement.startswith(READ_STATEMENTS) and "FOR UPDATE" not in sql.upper()
+
+
+class ReplicaRouter:
+
+    def __init__(self, primary: Database, replicas: List[Database]):
+        self.primary = primary
+        self.replicas = replicas
+
+        self._state = _RequestState()
+        self.primary_execute_sql = primary.execute_sql
+        primary.execute_sql = self.execute_sql
+        # A thread opening or closing the primary starts or ends a unit of work, e.g. a lazy listener
+        # run by with_connection
+        self._primary_connect = primary.connect
+        primary.connect = self._connect
+        self._primary_close = primary.close
+        primary.close = self._close
+
+    def _connect(self, *args, **kwargs):
+        self._reset()
+        return self._primary_connect(*args, **kwargs)
+
+    def _close(self):
+        self._reset()
+        return self._primary_close()
+
+    def execute_sql(self, sql, params=None):
+        state = self._state
+        if not is_read(sql):
+            state.wrote = True
+        elif not state.wrote and not self.primary.in_transaction():
+            if state.replica is None:
+                # One replica per request, so its reads see a single point of the replication
+                state.replica = random.choice(self.replicas)
+            try:
+                return state.replica.execute_sql(sql, params)
+            except (OperationalError, InterfaceError) as e:
+                logger.warning(f"Read replica failed, reading from the primary for the rest of the request: {e}")
+                self._close_replica()
+                state.wrote = True
+        return self.primary_execute_sql(sql, params)
+
+    def _close_replica(self):
+        replica = self._state.replica
+        self._state.replica = None
+        if replica is not None and not replica.is_closed():
+            try:
+                replica.close()
+            except (OperationalError, InterfaceError):
+                pass
+
+    def _reset(self):
+        if isinstance(self._state.replica, PooledDatabase):
+            # Hand the connection back to the replica's pool
+            self._close_replica()
+        self._state.replica = None
+        self._state.wrote = False
+
+    def per_request(self, func: Callable) -> Callable:
+        """ Run func as one request: reads go to a replica until it writes """
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self._reset()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._reset()
+
+        return wrapper
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
+            if isinstance(replica, PooledDatabase):
+                replica.close_all()
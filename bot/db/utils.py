@@ -1,16 +1,12 @@
 from peewee import Database, IntegrityError
 from db.models import User, UserProfile, WeekDays, TimeSlot
 from db.database import use_database
+from db.migrations import migrate
 
 
 def init_db_if_not(db: Database):
     use_database(db)
-    if not db.table_exists(User):
-        db.create_tables(
-            [
-                User, UserProfile, WeekDays, TimeSlot
-            ]
-        )
+    migrate(db)
 
 
 def create_user(db: Database, user, start_time, end_time, weekdays, timezone, logger):
@@ -0,0 +1,152 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from slack_sdk.errors import SlackApiError
+
+logger = logging.getLogger(__name__)
+
+# Calls per minute allowed by the Web API rate limit tiers, see https://api.slack.com/docs/rate-limits
+TIER_LIMITS = {1: 1, 2: 20, 3: 50, 4: 100}
+
+METHOD_TIERS = {
+    "chat.update": 3,
+    "chat.delete": 3,
+    "chat.postEphemeral": 4,
+    "conversations.members": 4,
+    "conversations.open": 3,
+    "users.info": 4,
+    "users.list": 2,
+    "views.open": 4,
+    "views.push": 4,
+    "views.update": 4,
+    "views.publish": 4,
+}
+DEFAULT_TIER = 3
+
+# Methods outside of the tiers, chat.postMessage allows about one message per second and channel
+SPECIAL_LIMITS = {
+    "chat.postMessage": 60,
+}
+# Methods limited per channel rather than per workspace
+PER_CHANNEL_METHODS = {"chat.postMessage"}
+
+# Errors worth another attempt, anything else is a bug or a state the caller has to handle
+TRANSIENT_ERRORS = {"ratelimited", "internal_error", "fatal_error", "service_unavailable", "request_timeout"}
+
+
+def retry_after(headers: dict, default: float = 1.0) -> float:
+    for name, value in headers.items():
+        if name.lower() == "retry-after":
+            return float(value[0] if isinstance(value, list) else value)
+    return default
+
+
+def api_method(method: str) -> str:
+    """ Web API method of a WebClient method name, e.g. chat_update -> chat.update """
+    return method.replace("_", ".")
+
+
+class _MethodLimiter:
+    """
+    Paces the calls to one method at its per minute limit, letting bursts of up to `burst`
+    calls through at once. Each caller reserves the next free slot, so waiting callers go
+    out in order.
+    """
+
+    def __init__(self, per_minute: int, burst: int):
+        self.interval = 60.0 / per_minute
+        self.tolerance = self.interval * (burst - 1)
+
+        self._theoretical_arrival = 0.0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """ Time at which the caller may send its call """
+        with self._lock:
+            now = time.monotonic()
+            self._theoretical_arrival = max(self._theoretical_arrival, now)
+            send_at = max(now, self._theoretical_arrival - self.tolerance, self._blocked_until)
+            self._theoretical_arrival = max(self._theoretical_arrival, send_at) + self.interval
+            return send_at
+
+    def wait(self):
+        """ Sleep until the caller's slot, and again if a Retry-After came in meanwhile """
+        while True:
+            delay = self.reserve() - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if time.monotonic() >= self._blocked_until:
+                return
+
+    def block(self, seconds: float):
+        """ Slack answered with a Retry-After, hold every call to the method until then """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class SlackApiDispatcher:
+    """
+    Outbound Slack Web API calls paced at the rate limits of their method, retried with jittered
+    exponential backoff on transient failures and held back for the Retry-After of a 429.
+
+    `call()` blocks until the call went through, possibly for the length of a Retry-After, so
+    listeners call it from their lazy listeners, once the ack went out.
+    """
+
+    def __init__(self, max_attempts: int = 5, backoff: float = 0.5, max_backoff: float = 30.0,
+                 burst: int = 5, limits: Optional[Dict[str, int]] = None):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.burst = burst
+        self.limits = dict(limits or {})
+
+        self._limiters: Dict[str, _MethodLimiter] = {}
+        self._limiters_lock = threading.Lock()
+
+    def per_minute(self, method: str) -> int:
+        if method in self.limits:
+            return self.limits[method]
+        if method in SPECIAL_LIMITS:
+            return SPECIAL_LIMITS[method]
+        return TIER_LIMITS[METHOD_TIERS.get(method, DEFAULT_TIER)]
+
+    def _limiter(self, method: str, channel: Optional[str]) -> _MethodLimiter:
+        key = f"{method}:{channel}" if method in PER_CHANNEL_METHODS else method
+        with self._limiters_lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = _MethodLimiter(self.per_minute(method), self.burst)
+            return limiter
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Full jitter, so that the calls of a burst do not retry in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def call(self, client, method: str, **kwargs):
+        """ client.<method>(**kwargs), e.g. call(client, "chat_update", channel=..., ts=...) """
+        limiter = self._limiter(api_method(method), kwargs.get("channel"))
+        for attempt in range(self.max_attempts):
+            limiter.wait()
+            try:
+                return getattr(client, method)(**kwargs)
+            except SlackApiError as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                if e.response.status_code == 429:
+                    seconds = retry_after(e.response.headers)
+                    logger.warning(f"{method} rate limited, retrying in {seconds}s")
+                    limiter.block(seconds)
+                elif e.response.status_code >= 500 or e.response.get("error") in TRANSIENT_ERRORS:
+                    time.sleep(self._retry_delay(attempt))
+                else:
+                    raise
+            except OSError as e:
+                if attempt == self.max_attempts - 1:
+                    raise
+                logger.warning(f"{method} failed, retrying: {e}")
+                time.sleep(self._retry_delay(attempt))
@@ -0,0 +1,127 @@
+"""
+Fan-out of the invitation DMs of a meeting to its participants.
+
+Messages are posted to the participants' user ids, Slack delivers them to their DM with the
+app without a conversations.open per participant, from a bounded pool of workers through the
+Slack API dispatcher. The delivery of each participant's DM is recorded on its
+MeetingParticipant row, a later run only sends what is still pending or failed.
+"""
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from peewee import Value, chunked
+from pytz import BaseTzInfo
+from slack_sdk.errors import SlackApiError
+
+from db.database import database_runtime
+from db.models import Meeting, MeetingParticipant, User
+from dispatcher import SlackApiDispatcher
+from utils import to_utc
+from views.meeting import MeetingParticipantView, MeetingParticipantSummaryView, MeetingParticipantActionView, \
+    PLACE_HOLDER_IMG
+
+logger = logging.getLogger(__name__)
+
+FANOUT_WORKERS = 16
+INSERT_BATCH_SIZE = 500
+
+
+def add_participants(meeting: Meeting, uids: Iterable[str]):
+    uids = list(dict.fromkeys(uids))
+    with database_runtime.atomic():
+        for batch in chunked(uids, INSERT_BATCH_SIZE):
+            User.insert_many([(uid,) for uid in batch], fields=[User.slack_uid]).on_conflict_ignore().execute()
+        MeetingParticipant.insert_from(
+            User.select(User.id, Value(meeting.id), Value("pending")).where(User.slack_uid.in_(uids)),
+            fields=[MeetingParticipant.user, MeetingParticipant.meeting, MeetingParticipant.delivery_status],
+        ).execute()
+
+
+def meeting_answers(meeting: Meeting) -> Dict[Optional[str], List[str]]:
+    """ rsvp -> slack uids of the participants who gave it, None for those who did not answer yet """
+    answers = {"yes": [], "maybe": [], "no": [], None: []}
+    query = MeetingParticipant.select(User.slack_uid, MeetingParticipant.rsvp).join(User) \
+        .where(MeetingParticipant.meeting == meeting).order_by(MeetingParticipant.rsvp_at, MeetingParticipant.id)
+    for uid, rsvp in query.tuples():
+        answers[rsvp].append(uid)
+    return answers
+
+
+def message_text(meeting: Meeting, organizer_uid: str) -> str:
+    """ Fallback text of the meeting messages, shown in notifications """
+    return f"<@{organizer_uid}> invited you to {meeting.title}"
+
+
+def meeting_message(meeting: Meeting, organizer_uid: str, uid: str, tz: BaseTzInfo,
+                    answers: Dict[Optional[str], List[str]], avatar_urls: dict) -> MeetingParticipantView:
+    return MeetingParticipantView(
+        scheduler_uid=organizer_uid,
+        scheduler_avatar_url=avatar_urls.get(organizer_uid, PLACE_HOLDER_IMG),
+        meeting_summary=MeetingParticipantSummaryView(
+            project_name=meeting.title,
+            start_datetime=to_utc(meeting.meeting_start).astimezone(tz),
+            end_datetime=to_utc(meeting.meeting_end).astimezone(tz),
+        ),
+        meeting_action=MeetingParticipantActionView(
+            # The organizer follows the answers, everyone else is asked for theirs
+            mode="status" if uid == organizer_uid else "questionnaire",
+            attend_users=answers["yes"],
+            may_attend_users=answers["maybe"],
+            wont_attend_users=answers["no"],
+            pending_users=[u for u in answers[None] if u != organizer_uid],
+            avatar_urls=avatar_urls,
+            meeting_id=meeting.id,
+        ),
+    )
+
+
+def send_invitations(dispatcher: SlackApiDispatcher, client, meeting: Meeting, organizer_uid: str, tz: BaseTzInfo,
+                     avatar_urls: Optional[dict] = None, workers: int = FANOUT_WORKERS) -> dict:
+    """ DM the invitation to the participants not reached yet, counts of the delivery statuses """
+    participants = list(
+        MeetingParticipant.select(MeetingParticipant, User).join(User)
+        .where(MeetingParticipant.meeting == meeting, MeetingParticipant.delivery_status != "sent")
+    )
+    answers = meeting_answers(meeting)
+    avatar_urls = avatar_urls or {}
+
+    def deliver(participant: MeetingParticipant) -> Tuple[MeetingParticipant, Optional[dict], Optional[str]]:
+        uid = participant.user.slack_uid
+        message = meeting_message(meeting, organizer_uid, uid, tz, answers, avatar_urls)
+        try:
+            result = dispatcher.call(
+                client, "chat_postMessage",
+                channel=uid,
+                text=message_text(meeting, organizer_uid),
+                blocks=message.blocks,
+                attachments=message.attachments,
+            )
+            return participant, result.data, None
+        except SlackApiError as e:
+            return participant, None, e.response.get("error") or str(e)
+        except OSError as e:
+            return participant, None, str(e)
+
+    counts = {"sent": 0, "failed": 0}
+    # Workers only talk to Slack, the delivery states are written from this thread
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="invitations") as executor:
+        for future in as_completed([executor.submit(deliver, p) for p in participants]):
+            participant, result, error = future.result()
+            if error is None:
+                participant.delivery_status = "sent"
+                participant.dm_channel = result["channel"]
+                participant.message_ts = result["ts"]
+                participant.delivery_error = None
+                participant.delivered_at = datetime.datetime.utcnow()
+            else:
+                logger.warning(f"Failed to invite {participant.user.slack_uid} to meeting {meeting.id}: {error}")
+                participant.delivery_status = "failed"
+                participant.delivery_error = error[:255]
+            participant.save(only=[
+                MeetingParticipant.delivery_status, MeetingParticipant.dm_channel, MeetingParticipant.message_ts,
+                MeetingParticipant.delivery_error, MeetingParticipant.delivered_at,
+            ])
+            counts[participant.delivery_status] += 1
+    return counts
@@ -1,24 +1,280 @@
 import datetime
+import hashlib
+import json
 import re
-from typing import Callable, NoReturn
+import time
+from typing import Callable, List, NoReturn, Optional
 
-import pytz
 from pytz import timezone
 from slack_bolt import App
 from slack_sdk.errors import SlackApiError
-from slack_sdk.models.blocks import DividerBlock, ButtonElement
+from slack_sdk.models.blocks import DividerBlock, ButtonElement, MarkdownTextObject, SectionBlock
 
-from db.models import User, UserProfile, TimeSlot
+from db.database import with_connection
+from db.models import User, UserProfile, TimeSlot, Meeting, MeetingParticipant
+from invitations import add_participants, send_invitations
 from models import set_personal_profiles_modal, create_meeting_modal, action_time, TimeSlotInfo, button, actions, hardcode_message_meeting
+from rsvp import RSVP_ACTIONS, answer_invitation, update_message
 from runtime import SlackBotRuntime
+from upcoming import cancel_meeting, project_meeting, reschedule_meeting, upcoming_meetings
+from scheduling.suggestions import suggest_meeting_times, profile_timezone
 from views.home import HomeView, HomeEditAvailabilityModal
 from views.meeting import CreateMeetingModal, MeetingParticipantView, MeetingParticipantSummaryView, \
-    MeetingParticipantActionView, CreateMeetingTimeSuggestionModal
+    MeetingParticipantActionView, CreateMeetingTimeSuggestionModal, PLACE_HOLDER_IMG, MAX_CONTEXT_AVATARS
 from views.users import SetProfileModal, NewUserMessage
 
 ListenerRegister = Callable[[App, SlackBotRuntime], NoReturn]
 
 
+def parse_create_meeting_values(values: dict) -> dict:
+    """ Flatten the state of CreateMeetingModal """
+    res = {
+        "title": None,
+        "conversations": [],
+        "duration": None,
+        "frequency": None,
+        "date": None,
+        "agenda": None,
+    }
+    for block_name, block in values.items():
+        for action_name, action in block.items():
+            if action_name == "meeting_create_meeting_title":
+                res["title"] = action["value"]
+            elif action_name == 'meeting_create_meeting_participants':
+                res["conversations"].extend(action.get('selected_conversations') or [])
+            elif action_name == 'meeting_create_meeting_duration':
+                if action.get('selected_option'):
+                    res["duration"] = action['selected_option']['value']
+            elif action_name == 'meeting_create_meeting_frequency':
+                if action.get('selected_option'):
+                    res["frequency"] = action['selected_option']['value']
+            elif action_name == 'meeting_create_meeting_date':
+                res["date"] = action['selected_date']
+            elif action_name == 'meeting_create_meeting_agenda':
+                res["agenda"] = action['value']
+    return res
+
+
+def expand_conversations(client, conversations: List[str]) -> List[str]:
+    """ Resolve the selected conversations (users and channels) into member uids """
+    uids = []
+    for conv in conversations:
+        if conv.startswith("C") or conv.startswith("G"):
+            cursor = None
+            while True:
+                result = client.conversations_members(channel=conv, cursor=cursor, limit=1000)
+                uids.extend(result["members"])
+                cursor = result.get("response_metadata", {}).get("next_cursor")
+                if not cursor:
+                    break
+        else:
+            uids.append(conv)
+    return uids
+
+
+def meeting_duration(meeting: dict) -> datetime.timedelta:
+    return datetime.timedelta(hours=float((meeting["duration"] or "1h").rstrip("h")))
+
+
+def user_timezone(uid: str):
+    return profile_timezone(UserProfile.select().join(User).where(User.slack_uid == uid).first())
+
+
+def suggest_time_slots(runtime: SlackBotRuntime, client, organizer_uid: str, values: dict) -> List[TimeSlotInfo]:
+    meeting = parse_create_meeting_values(values)
+
+    organizer_tz = user_timezone(organizer_uid)
+
+    duration = meeting_duration(meeting)
+    if meeting["date"]:
+        date = datetime.datetime.strptime(meeting["date"], "%Y-%m-%d").date()
+    else:
+        date = datetime.datetime.now(organizer_tz).date()
+
+    return suggest_meeting_times(
+        [organizer_uid, *expand_conversations(client, meeting["conversations"])],
+        date,
+        duration,
+        organizer_tz,
+        timeslot_index=runtime.timeslot_index,
+    )
+
+
+def home_view(uid: str, before: bool = True) -> HomeView:
+    return HomeView(before, upcoming_meetings=upcoming_meetings(uid), timezone=user_timezone(uid))
+
+
+def publish_home(runtime: SlackBotRuntime, client, uid: str, published: Optional[dict] = None) -> bool:
+    """
+    Publish the user's Home tab, rebuilt from the database, unless it is the view Slack already
+    shows: `published`, as sent with app_home_opened. Returns whether it did.
+    """
+    meetings = upcoming_meetings(uid)
+    tz = user_timezone(uid)
+    # Everything the view is rendered from, the edit availability block shows today's date
+    key = (
+        tuple((m.meeting_id, m.title, m.meeting_start, m.meeting_end, m.organizer_uid, m.rsvp) for m in meetings),
+        tz.zone,
+        datetime.date.today(),
+    )
+    cached = runtime.home_cache.get(uid, key)
+    if cached:
+        view, digest = cached
+    else:
+        view = HomeView(upcoming_meetings=meetings, timezone=tz).to_dict()
+        digest = hashlib.sha256(json.dumps(view, sort_keys=True).encode()).hexdigest()
+        runtime.home_cache.put(uid, key, view, digest)
+
+    # Slack sends the digest back with the view, whichever process or container published it
+    if published and published.get("private_metadata") == digest:
+        return False
+    client.views_publish(user_id=uid, view={**view, "private_metadata": digest})
+    return True
+
+
+def suggestion_view_external_id(body: dict) -> str:
+    return f"meeting_suggestion_{body['trigger_id']}"
+
+
+def update_time_suggestion_view(runtime: SlackBotRuntime, client, body: dict, logger, attempts: int = 5):
+    """ Fill the placeholder pushed by the ack of a create meeting interaction with the suggestions """
+    external_id = suggestion_view_external_id(body)
+    values = body["view"]["state"]["values"]
+    meeting = parse_create_meeting_values(values)
+    view = CreateMeetingTimeSuggestionModal(
+        time_slot_infos=suggest_time_slots(runtime, client, body["user"]["id"], values),
+        external_id=external_id,
+        # The agenda is left out, private_metadata is limited to 3000 characters
+        private_metadata=json.dumps({k: meeting[k] for k in ("title", "conversations", "duration", "frequency")}),
+    )
+    for attempt in range(attempts):
+        try:
+            client.views_update(external_id=external_id, view=view)
+            return
+        except SlackApiError as e:
+            # A view pushed through the ack response may not exist yet
+            if e.response.get("error") != "not_found" or attempt == attempts - 1:
+                logger.error("Error updating time suggestions: {}".format(e))
+                return
+            time.sleep(0.3 * (attempt + 1))
+
+
+def selected_time_slot(values: dict) -> Optional[str]:
+    """ Time slot picked in CreateMeetingTimeSuggestionModal, another time slot over the suggested ones """
+    selected = {}
+    for block in values.values():
+        for action_name, action in block.items():
+            if action.get("selected_option"):
+                selected[action_name] = action["selected_option"]["value"]
+    return selected.get("meeting_create_meeting_another_time_slot_select") \
+        or selected.get("meeting_create_meeting_time_suggestion_suggest_select")
+
+
+def create_meeting(runtime: SlackBotRuntime, client, body: dict, logger):
+    """ Save the meeting picked in CreateMeetingTimeSuggestionModal and invite its participants """
+    organizer_uid = body["user"]["id"]
+    time_slot_id = selected_time_slot(body["view"]["state"]["values"])
+    if not time_slot_id:
+        return
+    values = json.loads(body["view"]["private_metadata"])
+
+    start = datetime.datetime.utcfromtimestamp(int(time_slot_id))
+    organizer, _ = User.get_or_create(slack_uid=organizer_uid)
+    meeting = Meeting.create(
+        epoch=int(time_slot_id),
+        title=values["title"] or "Meeting",
+        meeting_start=start,
+        meeting_end=start + meeting_duration(values),
+        frequency=values["frequency"] or "0",
+        organizer=organizer,
+    )
+    uids = list(dict.fromkeys([organizer_uid, *expand_conversations(client, values["conversations"])]))
+    add_participants(meeting, uids)
+    project_meeting(meeting, organizer_uid)
+
+    counts = send_invitations(
+        runtime.slack_api, client, meeting, organizer_uid, user_timezone(organizer_uid),
+        avatar_urls=runtime.profile_cache.avatar_urls(client, uids[:MAX_CONTEXT_AVATARS + 1]),
+    )
+    logger.info(f"Invited {len(uids)} participants to meeting {meeting.id}: {counts}")
+
+
+def organized_meeting(meeting_id: int, uid: str) -> Optional[Meeting]:
+    """ The meeting, if the user organizes it """
+    return Meeting.select().join(User).where(Meeting.id == meeting_id, User.slack_uid == uid).first()
+
+
+def delivered_participants(meeting: Meeting) -> List[MeetingParticipant]:
+    """ Participants with an invitation message to keep up to date """
+    return list(MeetingParticipant.select()
+                .where(MeetingParticipant.meeting == meeting, MeetingParticipant.message_ts.is_null(False)))
+
+
+@with_connection
+def open_reschedule_view(runtime: SlackBotRuntime, client, body: dict, meeting_id: int):
+    """ Suggest other times for the meeting to its organizer, the one picked is saved by reschedule """
+    organizer_uid = body["user"]["id"]
+    meeting = organized_meeting(meeting_id, organizer_uid)
+    if meeting is None:
+        return
+    external_id = suggestion_view_external_id(body)
+    client.views_open(trigger_id=body["trigger_id"],
+                      view=CreateMeetingTimeSuggestionModal(external_id=external_id, loading=True))
+
+    tz = user_timezone(organizer_uid)
+    uids = [uid for uid, in MeetingParticipant.select(User.slack_uid).join(User)
+            .where(MeetingParticipant.meeting == meeting).tuples()]
+    time_slot_infos = suggest_meeting_times(
+        uids, datetime.datetime.now(tz).date(), meeting.meeting_end - meeting.meeting_start, tz,
+        timeslot_index=runtime.timeslot_index,
+    )
+    client.views_update(external_id=external_id, view=CreateMeetingTimeSuggestionModal(
+        time_slot_infos=time_slot_infos,
+        external_id=external_id,
+        private_metadata=json.dumps({"meeting_id": meeting.id}),
+        callback_id="meeting_reschedule_submit",
+    ))
+
+
+def reschedule(runtime: SlackBotRuntime, client, body: dict, logger):
+    """ Move the meeting to the time slot picked in the view of open_reschedule_view and update its messages """
+    time_slot_id = selected_time_slot(body["view"]["state"]["values"])
+    meeting = organized_meeting(json.loads(body["view"]["private_metadata"])["meeting_id"], body["user"]["id"])
+    if not time_slot_id or meeting is None:
+        return
+
+    start = datetime.datetime.utcfromtimestamp(int(time_slot_id))
+    reschedule_meeting(meeting, start, start + (meeting.meeting_end - meeting.meeting_start))
+    for participant in delivered_participants(meeting):
+        update_message(runtime, client, participant.id)
+    logger.info(f"Rescheduled meeting {meeting.id} to {start}")
+
+
+@with_connection
+def cancel(runtime: SlackBotRuntime, client, meeting_id: int, uid: str, logger):
+    """ Delete the meeting organized by the user and replace its messages with a notice """
+    meeting = organized_meeting(meeting_id, uid)
+    if meeting is None:
+        return
+    participants = delivered_participants(meeting)
+    cancel_meeting(meeting)
+
+    text = f"<@{uid}> cancelled {meeting.title}"
+    for participant in participants:
+        try:
+            runtime.slack_api.call(
+                client, "chat_update",
+                channel=participant.dm_channel,
+                ts=participant.message_ts,
+                text=text,
+                blocks=[SectionBlock(text=MarkdownTextObject(text=text))],
+                attachments=[],
+            )
+        except SlackApiError as e:
+            logger.warning(f"Could not update the message of {participant.id} on meeting {meeting_id}: {e}")
+    logger.info(f"Cancelled meeting {meeting_id}")
+
+
 def listen_events(app: App, runtime: SlackBotRuntime):
     @app.event("url_verification")
     def endpoint_url_validation(event, say):
@@ -29,15 +285,14 @@ def listen_events(app: App, runtime: SlackBotRuntime):
     @app.event("app_home_opened")
     def home_opened(event, say, client, logger):
         user_id = event["user"]
+        if event.get("tab") == "messages":
+            return
 
         try:
             # Call the views.publish method using the WebClient passed to listeners
             logger.debug("home start")
-            result = client.views_publish(
-                user_id=user_id,
-                view=HomeView()
-            )
-            logger.info(result)
+            if not publish_home(runtime, client, user_id, event.get("view")):
+                logger.debug("home unchanged, skip publishing")
 
         except SlackApiError as e:
             logger.error("Error fetching home page")
@@ -75,6 +330,14 @@ def listen_events(app: App, runtime: SlackBotRuntime):
             ]
         })
 
+    @app.event("user_change")
+    def user_change(event):
+        user = event["user"]
+        if user.get("profile"):
+            runtime.profile_cache.update(user["id"], user["profile"])
+        else:
+            runtime.profile_cache.invalidate(user["id"])
+
 
 def listen_messages(app: App, runtime: SlackBotRuntime):
     @app.message(":wave:")
@@ -128,11 +391,11 @@ def listen_messages(app: App, runtime: SlackBotRuntime):
     def test_view(message, say, client):
         uid = message['user']
 
-        user = client.users_profile_get(user=uid)
+        avatar_urls = runtime.profile_cache.avatar_urls(client, [uid])
 
         view = MeetingParticipantView(
             scheduler_uid=uid,
-            scheduler_avatar_url=user['profile']['image_24'],
+            scheduler_avatar_url=avatar_urls.get(uid, PLACE_HOLDER_IMG),
             meeting_summary=MeetingParticipantSummaryView(
                 project_name="TODO:",
                 start_datetime=datetime.datetime.now(tz=timezone("America/Los_Angeles")),
@@ -144,6 +407,7 @@ def listen_messages(app: App, runtime: SlackBotRuntime):
                 may_attend_users=[uid],
                 wont_attend_users=[uid],
                 pending_users=[uid],
+                avatar_urls=avatar_urls,
             ),
         )
         say(
@@ -153,7 +417,7 @@ def listen_messages(app: App, runtime: SlackBotRuntime):
 
         status_view = MeetingParticipantView(
             scheduler_uid=uid,
-            scheduler_avatar_url=user['profile']['image_24'],
+            scheduler_avatar_url=avatar_urls.get(uid, PLACE_HOLDER_IMG),
             meeting_summary=MeetingParticipantSummaryView(
                 project_name="TODO:",
                 start_datetime=datetime.datetime.now(tz=timezone("America/Los_Angeles")),
@@ -165,6 +429,7 @@ def listen_messages(app: App, runtime: SlackBotRuntime):
                 may_attend_users=[uid],
                 wont_attend_users=[uid],
                 pending_users=[uid],
+                avatar_urls=avatar_urls,
             ),
         )
         say(
@@ -200,72 +465,24 @@ def listen_actions(app: App, runtime: SlackBotRuntime):
         ack()
         logger.info(body)
 
-    @app.action("meeting_create_meeting_suggestion_push")
-    def meeting_create_meeting_suggestion_push(ack, body, client, logger):
+    # Suggestions can take longer than Slack's 3 seconds: push a placeholder right away and fill it in lazily
+    def meeting_create_meeting_suggestion_push(ack, body, client):
         ack()
 
         client.views_push(
             trigger_id=body["trigger_id"],
-            view=CreateMeetingTimeSuggestionModal(
-                time_slot_infos=[
-                    TimeSlotInfo(
-                        time_slot_id="test1",
-                        start_time=datetime.datetime.now(timezone("UTC")),
-                        end_time=datetime.datetime.now(timezone("UTC")) + datetime.timedelta(hours=1),
-                        timezone=pytz.timezone("America/Los_Angeles"),
-                        available_users=[],
-                        tentative_users=[],
-                        unavailable_users=[],
-                    ),
-                    TimeSlotInfo(
-                        time_slot_id="test2",
-                        start_time=datetime.datetime.now(timezone("UTC")),
-                        end_time=datetime.datetime.now(timezone("UTC")) + datetime.timedelta(hours=1),
-                        timezone=pytz.timezone("America/Los_Angeles"),
-                        available_users=[],
-                        tentative_users=[],
-                        unavailable_users=[],
-                    ),
-                    TimeSlotInfo(
-                        time_slot_id="test3",
-                        start_time=datetime.datetime.now(timezone("UTC")),
-                        end_time=datetime.datetime.now(timezone("UTC")) + datetime.timedelta(hours=1),
-                        timezone=pytz.timezone("America/Los_Angeles"),
-                        available_users=[],
-                        tentative_users=[],
-                        unavailable_users=[],
-                    ),
-                    TimeSlotInfo(
-                        time_slot_id="test4",
-                        start_time=datetime.datetime.now(timezone("UTC")),
-                        end_time=datetime.datetime.now(timezone("UTC")) + datetime.timedelta(hours=1),
-                        timezone=pytz.timezone("America/Los_Angeles"),
-                        available_users=[],
-                        tentative_users=[],
-                        unavailable_users=[],
-                    ),
-                    TimeSlotInfo(
-                        time_slot_id="test5",
-                        start_time=datetime.datetime.now(timezone("UTC")),
-                        end_time=datetime.datetime.now(timezone("UTC")) + datetime.timedelta(hours=1),
-                        timezone=pytz.timezone("America/Los_Angeles"),
-                        available_users=[],
-                        tentative_users=[],
-                        unavailable_users=[],
-                    ),
-                    TimeSlotInfo(
-                        time_slot_id="test6",
-                        start_time=datetime.datetime.now(timezone("UTC")),
-                        end_time=datetime.datetime.now(timezone("UTC")) + datetime.timedelta(hours=1),
-                        timezone=pytz.timezone("America/Los_Angeles"),
-                        available_users=[],
-                        tentative_users=[],
-                        unavailable_users=[],
-                    ),
-                ]
-            )
+            view=CreateMeetingTimeSuggestionModal(external_id=suggestion_view_external_id(body), loading=True)
         )
 
+    @with_connection
+    def meeting_create_meeting_suggestion_push_lazy(body, client, logger):
+        update_time_suggestion_view(runtime, client, body, logger)
+
+    app.action("meeting_create_meeting_suggestion_push")(
+        ack=meeting_create_meeting_suggestion_push,
+        lazy=[meeting_create_meeting_suggestion_push_lazy],
+    )
+
     @app.action("home_header_schedule_meeting")
     def home_header_schedule_meeting(ack, body, client, logger):
         ack()
@@ -323,9 +540,11 @@ def listen_actions(app: App, runtime: SlackBotRuntime):
         except SlackApiError as e:
             logger.error("Error setting profile: {}".format(e))
 
-    @app.action("add_available_time")
-    def add_available_time(ack, action, body, client, logger):
+    def add_available_time(ack):
         ack()
+
+    # views.update is paced and retried by the dispatcher, which may wait on a Retry-After: not on the ack path
+    def add_available_time_lazy(action, body, client, logger):
         index = action["action_id"][0]
 
         counter = 0
@@ -338,7 +557,8 @@ def listen_actions(app: App, runtime: SlackBotRuntime):
         new_view["blocks"] = body["view"]["blocks"]
         print(new_view["blocks"])
         try:
-            result = client.views_update(
+            result = runtime.slack_api.call(
+                client, "views_update",
                 view_id=body["container"]["view_id"],
                 # token=body["token"],
                 view=new_view
@@ -348,6 +568,8 @@ def listen_actions(app: App, runtime: SlackBotRuntime):
         except SlackApiError as e:
             logger.error("Error setting profile: {}".format(e))
 
+    app.action("add_available_time")(ack=add_available_time, lazy=[add_available_time_lazy])
+
     @app.action(re.compile("(\d+)\.actionId-0"))
     @app.action(re.compile("(\d+)\.actionId-1"))
     @app.action(re.compile("(\d+)\.actionId-2"))
@@ -404,15 +626,28 @@ def listen_actions(app: App, runtime: SlackBotRuntime):
     #     # except SlackApiError as e:
     #     #     logger.error("Error setting profile: {}".format(e))
 
-    @app.action(re.compile("meeting_part.*"))
-    @app.action("hnrB")
-    def process_meeting_part(ack, action, body, say, client):
-        ack(
-            # "???"
-        )
+    # Answers and message updates are written once the click was acked, from the lazy listener: it is
+    # only registered as one, its dispatcher calls may wait on a Retry-After
+    def meeting_part(ack):
+        ack()
+
+    def process_meeting_part(action, body, say, client, respond, logger):
+        rsvp = RSVP_ACTIONS.get(action["action_id"])
+        if rsvp and action.get("value"):
+            # Messages are re-rendered from the saved answers, once for a burst of clicks
+            answer_invitation(runtime, client, int(action["value"]), body["user"]["id"], rsvp, respond)
+            return
+        if action["action_id"] == MeetingParticipantActionView.meeting_part_summary_reschedule and action.get("value"):
+            open_reschedule_view(runtime, client, body, int(action["value"]))
+            return
+        if action["action_id"] == MeetingParticipantActionView.meeting_part_summary_cancel and action.get("value"):
+            cancel(runtime, client, int(action["value"]), body["user"]["id"], logger)
+            return
+
         attachments = body['message']['attachments']
         attachments.append(DividerBlock())
-        client.chat_update(
+        runtime.slack_api.call(
+            client, "chat_update",
             channel=body['channel']['id'],
             ts=body['message']['ts'],
             text=body['message']['text'],
@@ -425,6 +660,9 @@ def listen_actions(app: App, runtime: SlackBotRuntime):
         say(
         )
 
+    app.action(re.compile("meeting_part.*"))(ack=meeting_part, lazy=[process_meeting_part])
+    app.action("hnrB")(ack=meeting_part, lazy=[process_meeting_part])
+
     @app.action("home_edit_availability_but_clicked")
     def home_edit_availability(ack, client, body, logger):
         ack()
@@ -440,55 +678,46 @@ def listen_views(app: App, runtime: SlackBotRuntime):
     def noop(ack):
         ack()
 
-    @app.view("meeting_create_meeting_suggest_time_submit")
-    def meeting_create_meeting_suggest_time_submit(ack, client, body, ):
-        ack()
+    def meeting_create_meeting_suggest_time_submit(ack):
+        # Close the create meeting modals, the invitations go out from the lazy listener
+        ack(response_action="clear")
 
-        # Should store a timeslot
-        print(body)
+    @with_connection
+    def meeting_create_meeting_suggest_time_submit_lazy(body, client, logger):
+        create_meeting(runtime, client, body, logger)
 
-    @app.view("meeting_create_meeting_submit")
-    def meeting_create_meeting_submit(ack, client, body, ):
-        ack()
+    app.view("meeting_create_meeting_suggest_time_submit")(
+        ack=meeting_create_meeting_suggest_time_submit,
+        lazy=[meeting_create_meeting_suggest_time_submit_lazy],
+    )
 
-        values = body["view"]["state"]["values"]
+    def meeting_reschedule_submit(ack):
+        ack(response_action="clear")
 
-        title = None
-        convs = []
-        duration = None
-        frequency = None
-        date = None
-        agenda = None
-        for block_name, block in values.items():
-            for action_name, action in block.items():
-                if action_name == "meeting_create_meeting_title":
-                    title = action["value"]
-                    pass
-                elif action_name == 'meeting_create_meeting_participants':
-                    for conv in action['selected_conversations']:
-                        convs.append(conv)
-                elif action_name == 'meeting_create_meeting_duration':
-                    duration = action['selected_option']['value']
-                elif action_name == 'meeting_create_meeting_frequency':
-                    frequency = action['selected_option']['value']
-                elif action_name == 'meeting_create_meeting_date':
-                    date = action['selected_date']
-                elif action_name == 'meeting_create_meeting_agenda':
-                    agenda = action['value']
-
-        # Filter the convs list as there might be channels or apps
-        # for uid in convs:
-        #     if uid.startswith("C"):
-        #         client.conversations_info(channel=uid)
-
-        # with runtime.db.atomic() as transaction:
-        #     for user_or_chan in convs:
-        #         pass
-        client.views_push(
-            trigger_id=body["trigger_id"],
-            view=CreateMeetingTimeSuggestionModal()
+    @with_connection
+    def meeting_reschedule_submit_lazy(body, client, logger):
+        reschedule(runtime, client, body, logger)
+
+    app.view("meeting_reschedule_submit")(
+        ack=meeting_reschedule_submit,
+        lazy=[meeting_reschedule_submit_lazy],
+    )
+
+    def meeting_create_meeting_submit(ack, body):
+        ack(
+            response_action="push",
+            view=CreateMeetingTimeSuggestionModal(external_id=suggestion_view_external_id(body), loading=True),
         )
 
+    @with_connection
+    def meeting_create_meeting_submit_lazy(body, client, logger):
+        update_time_suggestion_view(runtime, client, body, logger)
+
+    app.view("meeting_create_meeting_submit")(
+        ack=meeting_create_meeting_submit,
+        lazy=[meeting_create_meeting_submit_lazy],
+    )
+
     @app.view("personal_profile")
     def personal_profile(ack, body, client, view, logger):
         values = view["state"]["values"]
@@ -508,7 +737,7 @@ def listen_views(app: App, runtime: SlackBotRuntime):
 
         user = body["user"]["id"]
 
-        view = HomeView(False)
+        view = home_view(user, before=False)
         try:
             result = client.views_update(
                 external_id="home",
@@ -670,20 +899,34 @@ def listen_user_flow(app: App, runtime: SlackBotRuntime):
         start = None
         end = None
         status = None
+        weekday_magic = None
         for block_name, block in state.items():
             for action_name, act in block.items():
                 if action_name == 'user_edit_availability_available_time_start':
                     start = act['selected_time']
-                elif action_name == 'user_edit_availability_available_time_start':
+                elif action_name == 'user_edit_availability_available_time_end':
                     end = act['selected_time']
                 elif action_name == 'user_edit_availability_available_time_status':
-                    status = act['selected_option']
+                    status = act['selected_option']['value'] if act.get('selected_option') else None
+                elif action_name == 'user_edit_availability_weekday_selected':
+                    weekday_magic = int(act['selected_option']['value']) if act.get('selected_option') else None
 
         if start and end and status:
-            TimeSlot.create(
+            # The slot is for the next occurrence of the selected weekday
+            day = datetime.datetime.now(user_tz).date()
+            if weekday_magic:
+                for _ in range(6):
+                    if (1 << day.weekday()) & weekday_magic:
+                        break
+                    day += datetime.timedelta(days=1)
+
+            time_slot = TimeSlot.create(
                 user=user,
                 type="availability",
-                start=user_tz.localize(datetime.datetime.strptime(start, "%-I:%M%p")).astimezone(timezone('UTC')),
-                end=user_tz.localize(datetime.datetime.strptime(end, "%-I:%M%p")).astimezone(timezone('UTC')),
+                start=user_tz.localize(datetime.datetime.combine(
+                    day, datetime.datetime.strptime(start, "%H:%M").time())).astimezone(timezone('UTC')),
+                end=user_tz.localize(datetime.datetime.combine(
+                    day, datetime.datetime.strptime(end, "%H:%M").time())).astimezone(timezone('UTC')),
                 status_label=status.lower(),
             )
+            runtime.timeslot_index.add(time_slot)
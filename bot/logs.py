@@ -0,0 +1,136 @@
+"""
+Structured JSON logging.
+
+Handlers only enqueue records, a background QueueListener thread formats and writes them, so
+logging costs the request path little more than building the record. A Lambda container is
+frozen once the response is returned, the Lambda handler writes the queued records out with
+flush_logging() first. Slack request payloads are logged on the `slack_bot.requests` logger:
+below WARNING only a sample of them is kept.
+The sampled ones are redacted and truncated as they are enqueued, so the queue holds a copy the
+listeners can no longer change, e.g. when they rewrite body["view"].
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Iterable, Optional
+
+REQUEST_LOGGER_NAME = "slack_bot.requests"
+
+request_logger = logging.getLogger(REQUEST_LOGGER_NAME)
+
+# Attributes of every LogRecord, anything else was passed with `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def redact(value: Any, redact_fields: frozenset, max_length: int, depth: int = 0, max_depth: int = 8) -> Any:
+    """ Copy of a JSON-like value with the redact_fields masked and long strings and lists cut """
+    if depth > max_depth:
+        return "..."
+    if isinstance(value, dict):
+        return {
+            k: "[REDACTED]" if k in redact_fields else redact(v, redact_fields, max_length, depth + 1, max_depth)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        res = [redact(v, redact_fields, max_length, depth + 1, max_depth) for v in value[:max_length]]
+        if len(value) > max_length:
+            res.append(f"... {len(value) - max_length} more")
+        return res
+    if isinstance(value, str) and len(value) > max_length:
+        return f"{value[:max_length]}... ({len(value)} chars)"
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        res = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                res[key] = value
+        if record.exc_info:
+            res["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(res, default=str)
+
+
+class RedactingQueueHandler(QueueHandler):
+    """
+    Enqueue records with their `extra` fields redacted and truncated. prepare() runs on the
+    logging thread, once the logger filters kept the record.
+    """
+
+    def __init__(self, records: queue.SimpleQueue, redact_fields: Iterable[str] = (), max_field_length: int = 256):
+        super().__init__(records)
+        self.redact_fields = frozenset(redact_fields)
+        self.max_field_length = max_field_length
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        for key, value in list(vars(record).items()):
+            if key not in _RECORD_ATTRIBUTES:
+                setattr(record, key, redact(value, self.redact_fields, self.max_field_length))
+        return record
+
+
+class SampleFilter(logging.Filter):
+    """ Keep a sample_rate share of the records below WARNING """
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.sample_rate
+
+
+def setup_logging(level: str = "INFO",
+                  request_sample_rate: float = 1.0,
+                  redact_fields: Iterable[str] = (),
+                  max_field_length: int = 256):
+    """ Route the root logger through a queue to a JSON stream handler. Later calls only reconfigure. """
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    request_logger.filters = [SampleFilter(request_sample_rate)]
+
+    if _listener is not None:
+        for handler in root.handlers:
+            if isinstance(handler, RedactingQueueHandler):
+                handler.redact_fields = frozenset(redact_fields)
+                handler.max_field_length = max_field_length
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+    root.addHandler(RedactingQueueHandler(records, redact_fields, max_field_length))
+
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def flush_logging():
+    """ Write out the records queued so far, e.g. before a Lambda container is frozen """
+    with _listener_lock:
+        if _listener is None:
+            return
+        # stop() returns once the listener thread wrote everything enqueued before it
+        _listener.stop()
+        _listener.start()
@@ -0,0 +1,195 @@
+"""
+In-memory latency histograms per listener, to find the handlers that miss Slack's 3 seconds.
+
+For every request the latency middleware records, under the request's listener key (e.g.
+`view:meeting_create_meeting_submit`):
+    ack    time from the start of the dispatch to ack()
+    total  time spent in the middlewares and listener, i.e. in App.dispatch
+    db     time spent executing SQL on the request thread
+    slack  time spent in Slack Web API calls on the request thread
+"""
+import bisect
+import functools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from peewee import Database
+from slack_bolt import App, BoltRequest, BoltResponse
+from slack_bolt.context.ack import Ack
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets, in milliseconds
+BUCKET_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2000, 3000, 5000, 10000]
+
+
+class Histogram:
+    def __init__(self, bounds: List[float] = None):
+        self.bounds = bounds or BUCKET_BOUNDS_MS
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """ Upper bound of the bucket holding the q-quantile, max for the overflow bucket """
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": dict(zip([str(b) for b in self.bounds] + ["+Inf"], self.counts)),
+        }
+
+
+@dataclass
+class _RequestTimer:
+    key: str
+    started: float
+    ack_ms: Optional[float] = None
+    db_ms: float = 0.0
+    slack_ms: float = 0.0
+
+
+class TimedAck(Ack):
+    """ Bolt's Ack, reporting when it is first called """
+
+    def __init__(self, on_ack: Callable[[], None]):
+        super().__init__()
+        self._on_ack = on_ack
+
+    def __call__(self, *args, **kwargs):
+        try:
+            return super().__call__(*args, **kwargs)
+        finally:
+            if self._on_ack:
+                self._on_ack()
+                self._on_ack = None
+
+
+class LatencyMetrics:
+    def __init__(self, ack_warn_threshold_ms: float = 2000):
+        self.ack_warn_threshold_ms = ack_warn_threshold_ms
+
+        self._histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def current(self) -> Optional[_RequestTimer]:
+        return getattr(self._local, "timer", None)
+
+    def observe(self, key: str, metric: str, value_ms: float):
+        with self._lock:
+            histogram = self._histograms.setdefault(key, {}).get(metric)
+            if histogram is None:
+                histogram = self._histograms[key][metric] = Histogram()
+            histogram.observe(value_ms)
+
+    def start(self, key: str) -> _RequestTimer:
+        self._local.timer = _RequestTimer(key=key, started=time.perf_counter())
+        return self._local.timer
+
+    def acked(self, timer: _RequestTimer):
+        if timer.ack_ms is not None:
+            return
+        timer.ack_ms = (time.perf_counter() - timer.started) * 1000
+        if timer.ack_ms > self.ack_warn_threshold_ms:
+            logger.warning(f"{timer.key} acked after {timer.ack_ms:.0f}ms",
+                           extra={"listener": timer.key, "ack_ms": timer.ack_ms})
+
+    def finish(self, timer: _RequestTimer):
+        self._local.timer = None
+        self.observe(timer.key, "total", (time.perf_counter() - timer.started) * 1000)
+        if timer.ack_ms is not None:
+            self.observe(timer.key, "ack", timer.ack_ms)
+        self.observe(timer.key, "db", timer.db_ms)
+        self.observe(timer.key, "slack", timer.slack_ms)
+
+    def timed(self, func: Callable, attribute: str) -> Callable:
+        """ func adding its duration to the attribute of the current request timer, if any """
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer = self.current
+                if timer is not None:
+                    setattr(timer, attribute, getattr(timer, attribute) + (time.perf_counter() - started) * 1000)
+
+        return wrapper
+
+    def instrument_database(self, db: Database):
+        db.execute_sql = self.timed(db.execute_sql, "db_ms")
+
+    def instrument_app(self, app: App):
+        """
+        Time every request dispatched by the app. Bolt runs the listeners once the whole middleware
+        chain has returned, so the timer is kept around App.dispatch rather than in a middleware.
+        """
+        dispatch = app.dispatch
+
+        @functools.wraps(dispatch)
+        def timed_dispatch(req: BoltRequest) -> BoltResponse:
+            timer = self.start(listener_key(req.body))
+            try:
+                return dispatch(req)
+            finally:
+                self.finish(timer)
+
+        app.dispatch = timed_dispatch
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        """ listener key -> metric -> histogram summary """
+        with self._lock:
+            return {
+                key: {metric: histogram.snapshot() for metric, histogram in histograms.items()}
+                for key, histograms in self._histograms.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+def listener_key(body: dict) -> str:
+    """ Which listener handles the request, e.g. action:<action_id> or view:<callback_id> """
+    payload_type = body.get("type")
+    if payload_type == "event_callback":
+        return f"event:{body.get('event', {}).get('type')}"
+    if payload_type == "block_actions":
+        return f"action:{(body.get('actions') or [{}])[0].get('action_id')}"
+    if payload_type in ("view_submission", "view_closed"):
+        return f"view:{body.get('view', {}).get('callback_id')}"
+    if payload_type in ("shortcut", "message_action"):
+        return f"shortcut:{body.get('callback_id')}"
+    if payload_type == "block_suggestion":
+        return f"options:{body.get('action_id')}"
+    if "command" in body:
+        return f"command:{body['command']}"
+    return str(payload_type)
+
+
+latency_metrics = LatencyMetrics()
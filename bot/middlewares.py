@@ -1,16 +1,32 @@
 from typing import Callable, NoReturn
 from slack_bolt import App
 
+from logs import request_logger
+from metrics import latency_metrics, TimedAck
+
 MiddlewareRegister = Callable[[App], NoReturn]
 
 
 def global_middlewares(app: App):
+    # Sampled, then redacted and truncated by the logging setup before it is queued
     @app.use
-    def global_log_request(logger, body, next):
-        logger.info(body)
+    def global_log_request(body, next):
+        request_logger.info("Slack request", extra={"body": body})
         return next()
 
     @app.error
     def global_err_handler(error, body, logger):
         logger.exception(f"Error: {error}")
-        logger.info(f"Request body: {body}")
+        request_logger.error("Failed Slack request", extra={"body": body})
+
+
+def latency_middlewares(app: App):
+    # The request timer is started and finished around App.dispatch, see LatencyMetrics.instrument_app
+    @app.use
+    def record_latency(context, client, next):
+        timer = latency_metrics.current
+        if timer is not None:
+            context["ack"] = TimedAck(lambda: latency_metrics.acked(timer))
+            # Bolt builds a WebClient per request, every Web API method goes through its api_call
+            client.api_call = latency_metrics.timed(client.api_call, "slack_ms")
+        return next()
@@ -7,8 +7,6 @@ from pytz import BaseTzInfo
 from slack_sdk.models.blocks import PlainTextObject, Block, ButtonElement, ActionsBlock
 from slack_sdk.models.views import View
 
-from db.models import User
-
 
 @dataclass
 class TimeSlotInfo:
@@ -16,9 +14,9 @@ class TimeSlotInfo:
     start_time: datetime.datetime  # In UTC
     end_time: datetime.datetime   # In UTC
     timezone: BaseTzInfo  # pytz supported timezone str
-    available_users: List[User]
-    tentative_users: List[User]
-    unavailable_users: List[User]
+    available_users: List[str]  # slack uids
+    tentative_users: List[str]
+    unavailable_users: List[str]
 
 
 class Modal(View):
@@ -0,0 +1,123 @@
+"""
+Bulk import of a workspace's members into User/UserProfile, for installs on large workspaces
+where waiting for every member to submit their profile is not an option.
+
+Members are read from users.list page by page and written with batched multi-row inserts that
+ignore the rows already there, so running the import again never overwrites a profile set by
+its user. The cursor of the next page is saved in the same transaction as each page, so an
+interrupted import resumes where it stopped:
+
+    SLACK_BOT_TOKEN=xoxb-... DB_NAME=... python bot/onboarding.py [--restart]
+"""
+import datetime
+import logging
+import sys
+from typing import Iterable, List, Optional
+
+import pytz
+from peewee import Database, chunked
+from slack_sdk import WebClient
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+
+from db.models import User, UserProfile, UserImportState
+from scheduling.bitmap import WEEKLY_TEMPLATE_BYTES, weekly_template
+
+logger = logging.getLogger(__name__)
+
+# users.list is a tier 2 method, bigger pages mean fewer rate limited calls
+USERS_LIST_PAGE_SIZE = 200
+INSERT_BATCH_SIZE = 500
+
+DEFAULT_TIMEZONE = "America/Los_Angeles"
+DEFAULT_WORKING_HOURS_START = datetime.datetime.strptime("10:00", "%H:%M")
+DEFAULT_WORKING_HOURS_END = datetime.datetime.strptime("18:00", "%H:%M")
+# Monday to Friday, see UserProfile.workdays flags
+DEFAULT_WORKDAYS = 1 | 2 | 4 | 8 | 16
+DEFAULT_WEEKLY_TEMPLATE = weekly_template(
+    DEFAULT_WORKDAYS, DEFAULT_WORKING_HOURS_START, DEFAULT_WORKING_HOURS_END,
+).to_bytes(WEEKLY_TEMPLATE_BYTES, "little")
+
+
+def is_importable(member: dict) -> bool:
+    return not (member.get("deleted") or member.get("is_bot") or member.get("id") == "USLACKBOT")
+
+
+def member_timezone(member: dict) -> str:
+    tz = member.get("tz")
+    if tz in pytz.all_timezones_set:
+        return tz
+    return DEFAULT_TIMEZONE
+
+
+def import_members(members: Iterable[dict]) -> int:
+    """ Create the users and default profiles of members not known yet. Returns the number of users created. """
+    timezones = {m["id"]: member_timezone(m) for m in members if is_importable(m)}
+    if not timezones:
+        return 0
+
+    created = 0
+    for batch in chunked(timezones, INSERT_BATCH_SIZE):
+        # Members imported before, e.g. by a resumed import, are skipped and not counted
+        created += User.insert_many([{"slack_uid": uid} for uid in batch]).on_conflict_ignore().as_rowcount().execute()
+
+    for batch in chunked(timezones, INSERT_BATCH_SIZE):
+        # Users created before the import keep their profile, UserProfile.user is unique
+        UserProfile.insert_many([
+            {
+                "user": user_id,
+                "timezone": timezones[slack_uid],
+                "workdays": DEFAULT_WORKDAYS,
+                "working_hours_start": DEFAULT_WORKING_HOURS_START,
+                "working_hours_end": DEFAULT_WORKING_HOURS_END,
+                "weekly_template": DEFAULT_WEEKLY_TEMPLATE,
+            }
+            for user_id, slack_uid in User.select(User.id, User.slack_uid).where(User.slack_uid.in_(batch)).tuples()
+        ]).on_conflict_ignore().execute()
+
+    return created
+
+
+def import_workspace_users(db: Database, client: WebClient, restart: bool = False,
+                           page_size: int = USERS_LIST_PAGE_SIZE) -> UserImportState:
+    """ Import every member of the client's workspace, resuming a previous import unless restart """
+    team_id = client.auth_test()["team_id"]
+    state, _ = UserImportState.get_or_create(team_id=team_id)
+    if restart:
+        state.cursor = None
+        state.imported = 0
+        state.started_at = datetime.datetime.utcnow()
+        state.completed_at = None
+        state.save()
+    elif state.completed_at:
+        logger.info(f"Members of {team_id} were already imported on {state.completed_at}")
+        return state
+
+    if not any(isinstance(h, RateLimitErrorRetryHandler) for h in client.retry_handlers):
+        client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=5))
+
+    while True:
+        resp = client.users_list(cursor=state.cursor, limit=page_size)
+        next_cursor: Optional[str] = resp.get("response_metadata", {}).get("next_cursor") or None
+        members: List[dict] = resp["members"]
+
+        with db.atomic():
+            state.imported += import_members(members)
+            state.cursor = next_cursor
+            if not next_cursor:
+                state.completed_at = datetime.datetime.utcnow()
+            state.save()
+
+        logger.info(f"Imported {state.imported} members of {team_id}")
+        if not next_cursor:
+            return state
+
+
+if __name__ == '__main__':
+    from app import create_database
+    from config import SlackBotConfig
+    from db.utils import init_db_if_not
+
+    _config = SlackBotConfig.from_env()
+    _db = create_database(_config)
+    init_db_if_not(_db)
+    import_workspace_users(_db, WebClient(token=_config.slack_bot_token), restart="--restart" in sys.argv[1:])
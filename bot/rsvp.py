@@ -0,0 +1,116 @@
+"""
+Answers of the participants to meeting invitations.
+
+A click on Yes/No/Maybe records the answer, and replaces the participant's message with one
+rendered from the recorded answers, through the response_url of the click. The organizer's status
+message is updated through chat.update, paced by the Slack API dispatcher, once per burst of
+answers: the first answer claims the update in Meeting.rsvp_render_at and makes it
+RSVP_RENDER_DELAY later, the answers arriving meanwhile find it claimed and leave it to that
+one. The claim lives in the database, so it holds across the separate invocations handling the
+clicks on Lambda.
+"""
+import datetime
+import time
+from typing import Callable, Optional, Tuple
+
+from db.database import database_runtime, with_connection
+from db.models import Meeting, MeetingParticipant, User, UserProfile
+from invitations import meeting_answers, meeting_message, message_text
+from runtime import SlackBotRuntime
+from scheduling.suggestions import profile_timezone
+from upcoming import set_rsvp
+from views.meeting import MeetingParticipantActionView, MAX_CONTEXT_AVATARS
+
+# Seconds to wait for more answers before updating the organizer's message
+RSVP_RENDER_DELAY = 1.0
+# Claims of updates not made by then, e.g. of a failed invocation, are given to the next answer
+RSVP_RENDER_TIMEOUT = datetime.timedelta(seconds=60)
+
+RSVP_ACTIONS = {
+    MeetingParticipantActionView.meeting_part_quest_yes: "yes",
+    MeetingParticipantActionView.meeting_part_quest_maybe: "maybe",
+    MeetingParticipantActionView.meeting_part_quest_no: "no",
+}
+
+
+@with_connection
+def record_rsvp(meeting_id: int, uid: str, rsvp: str) \
+        -> Tuple[Optional[MeetingParticipant], Optional[MeetingParticipant]]:
+    """
+    Save the answer, (participant, organizer) whose messages show it. The organizer is only
+    returned to the answer claiming the update of their message, see update_organizer_message.
+    """
+    participant = MeetingParticipant.select().join(User) \
+        .where(MeetingParticipant.meeting == meeting_id, User.slack_uid == uid).first()
+    if participant is None:
+        return None, None
+    now = datetime.datetime.utcnow()
+    participant.rsvp = rsvp
+    participant.rsvp_at = now
+    meeting = Meeting.get_by_id(meeting_id)
+    organizer = MeetingParticipant.get_or_none(meeting=meeting, user=meeting.organizer_id)
+    with database_runtime.atomic():
+        participant.save(only=[MeetingParticipant.rsvp, MeetingParticipant.rsvp_at])
+        set_rsvp(participant)
+        # The organizer's own answer is shown through respond
+        if organizer is None or organizer.id == participant.id or not organizer.message_ts:
+            return participant, None
+        claimed = Meeting.update(rsvp_render_at=now + datetime.timedelta(seconds=RSVP_RENDER_DELAY)).where(
+            Meeting.id == meeting_id,
+            Meeting.rsvp_render_at.is_null() | (Meeting.rsvp_render_at < now - RSVP_RENDER_TIMEOUT),
+        ).execute()
+    return participant, organizer if claimed else None
+
+
+@with_connection
+def update_message(runtime: SlackBotRuntime, client, participant_id: int, respond: Callable = None):
+    """ Render the participant's message from the saved answers, through respond if given """
+    with database_runtime.atomic():
+        query = MeetingParticipant.select(MeetingParticipant, User).join(User) \
+            .where(MeetingParticipant.id == participant_id)
+        if database_runtime.for_update:
+            # Serializes the updates of the message across processes, the last one reads the last answers
+            query = query.for_update()
+        participant = query.get()
+        meeting = Meeting.select(Meeting, User).join(User).where(Meeting.id == participant.meeting_id).get()
+        organizer_uid = meeting.organizer.slack_uid
+
+        answers = meeting_answers(meeting)
+        tz = profile_timezone(UserProfile.get_or_none(UserProfile.user == meeting.organizer_id))
+        shown = [organizer_uid, *(uid for uids in answers.values() for uid in uids[:MAX_CONTEXT_AVATARS])]
+        message = meeting_message(meeting, organizer_uid, participant.user.slack_uid, tz, answers,
+                                  runtime.profile_cache.avatar_urls(client, shown))
+        if respond is not None:
+            respond(text=message_text(meeting, organizer_uid), blocks=message.blocks,
+                    attachments=message.attachments, replace_original=True)
+            return
+        runtime.slack_api.call(
+            client, "chat_update",
+            channel=participant.dm_channel,
+            ts=participant.message_ts,
+            text=message_text(meeting, organizer_uid),
+            blocks=message.blocks,
+            attachments=message.attachments,
+        )
+
+
+@with_connection
+def update_organizer_message(runtime: SlackBotRuntime, client, organizer: MeetingParticipant):
+    """ Release the claim of the update, then render the organizer's message with the answers saved so far """
+    Meeting.update(rsvp_render_at=None).where(Meeting.id == organizer.meeting_id).execute()
+    update_message(runtime, client, organizer.id)
+
+
+def answer_invitation(runtime: SlackBotRuntime, client, meeting_id: int, uid: str, rsvp: str,
+                      respond: Callable = None) -> Optional[MeetingParticipant]:
+    """ Record the answer and show it, in the organizer's message once the burst it belongs to is over """
+    participant, organizer = record_rsvp(meeting_id, uid, rsvp)
+    if participant is None:
+        return None
+    try:
+        update_message(runtime, client, participant.id, respond)
+    finally:
+        if organizer is not None:
+            time.sleep(RSVP_RENDER_DELAY)
+            update_organizer_message(runtime, client, organizer)
+    return participant
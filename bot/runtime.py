@@ -1,9 +1,17 @@
 from peewee import Database
 
+from caches import HomeTabCache, SlackProfileCache
+from dispatcher import SlackApiDispatcher
+from scheduling.intervals import TimeSlotIndex
+
 
 class SlackBotRuntime:
     def __init__(self, db: Database):
         self._db = db
+        self.timeslot_index = TimeSlotIndex()
+        self.profile_cache = SlackProfileCache()
+        self.home_cache = HomeTabCache()
+        self.slack_api = SlackApiDispatcher()
 
     @property
     def db(self) -> Database:
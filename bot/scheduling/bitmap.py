@@ -0,0 +1,92 @@
+"""
+Availability bitmaps: bit i of an int is the i-th fixed-size slot of a window.
+Python ints are arbitrary length, so one `&`/`|`/`>>` covers every slot at once.
+"""
+import datetime
+from typing import Iterator, List, Tuple
+
+SLOT_MINUTES = 5
+SLOT_SECONDS = SLOT_MINUTES * 60
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_PER_WEEK = 7 * SLOTS_PER_DAY
+# UserProfile.weekly_template, one bit per slot of the week
+WEEKLY_TEMPLATE_BYTES = SLOTS_PER_WEEK // 8
+
+
+def range_mask(start: int, end: int) -> int:
+    """Bits [start, end), clipped at 0."""
+    start = max(start, 0)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def run_mask(bitmap: int, length: int) -> int:
+    """Bit i is set iff bits [i, i + length) are all set in bitmap."""
+    result = bitmap
+    covered = 1
+    while covered < length and result:
+        shift = min(covered, length - covered)
+        result &= result >> shift
+        covered += shift
+    return result
+
+
+def runs(bitmap: int) -> Iterator[Tuple[int, int]]:
+    """[start, end) of every run of set bits, lowest first."""
+    offset = 0
+    while bitmap:
+        start = (bitmap & -bitmap).bit_length() - 1
+        bitmap >>= start
+        length = ((bitmap + 1) & ~bitmap).bit_length() - 1
+        yield offset + start, offset + start + length
+        bitmap >>= length
+        offset += start + length
+
+
+def weekly_template(workdays: int, start: datetime.time, end: datetime.time) -> int:
+    """
+    Working hours from start to end on the workdays (bit d is weekday d, Monday = 0) as a bitmap
+    of the slots of a week in local time, bit 0 being Monday 00:00. Hours ending before they
+    start run overnight, Sunday's into Monday.
+    """
+    start_slot = -(-(start.hour * 60 + start.minute) // SLOT_MINUTES)
+    end_slot = (end.hour * 60 + end.minute) // SLOT_MINUTES
+    if (end.hour, end.minute) <= (start.hour, start.minute):
+        end_slot += SLOTS_PER_DAY
+
+    template = 0
+    for day in range(7):
+        if workdays & (1 << day):
+            template |= range_mask(day * SLOTS_PER_DAY + start_slot, day * SLOTS_PER_DAY + end_slot)
+    return (template | template >> SLOTS_PER_WEEK) & range_mask(0, SLOTS_PER_WEEK)
+
+
+def step_mask(n_slots: int, step: int, offset: int = 0) -> int:
+    mask = 0
+    for i in range(offset, n_slots, step):
+        mask |= 1 << i
+    return mask
+
+
+class BitCounter:
+    """
+    Bit-sliced counter: adds whole bitmaps at once and keeps, for every slot, the
+    number of bitmaps that had that slot set. planes[k] holds bit k of each count.
+    """
+
+    def __init__(self):
+        self.planes: List[int] = []
+
+    def add(self, bitmap: int):
+        carry = bitmap
+        for k, plane in enumerate(self.planes):
+            if not carry:
+                return
+            self.planes[k] = plane ^ carry
+            carry &= plane
+        if carry:
+            self.planes.append(carry)
+
+    def count(self, slot: int) -> int:
+        return sum(((plane >> slot) & 1) << k for k, plane in enumerate(self.planes))
@@ -0,0 +1,156 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from db.models import TimeSlot
+from utils import to_utc
+
+
+class IntervalEntry(NamedTuple):
+    slot_id: int  # TimeSlot.id
+    start: int  # UTC epoch seconds
+    end: int  # UTC epoch seconds, exclusive
+    status_label: str
+
+    @classmethod
+    def from_timeslot(cls, slot: TimeSlot) -> "IntervalEntry":
+        return cls(
+            slot_id=slot.id,
+            start=int(to_utc(slot.start).timestamp()),
+            end=int(to_utc(slot.end).timestamp()),
+            status_label=slot.status_label,
+        )
+
+
+def load_entries(*conditions) -> Dict[int, List[IntervalEntry]]:
+    """ Intervals of the TimeSlots matching conditions by user id, read as stored in epoch minutes """
+    entries = defaultdict(list)
+    query = TimeSlot.select(
+        TimeSlot.id, TimeSlot.user, TimeSlot.start.coerce(False), TimeSlot.end.coerce(False), TimeSlot.status_label,
+    ).where(*conditions).tuples()
+    for slot_id, user_id, start, end, status_label in query:
+        entries[user_id].append(IntervalEntry(slot_id, start * 60, end * 60, status_label))
+    return entries
+
+
+class UserIntervals:
+    """
+    Intervals of one user, bucketed by length: bucket k holds the intervals whose length has k
+    bits, i.e. is in [2^(k-1), 2^k), sorted by start. An interval of a bucket overlapping [a, b)
+    starts in (a - longest of the bucket, b), and the ones of that range ending before a are at
+    least half as long as the range. A query is then two bisects per bucket plus the intervals it
+    returns and a few misses, whatever the mix of short and long intervals of the user.
+    """
+
+    def __init__(self, entries: Iterable[IntervalEntry] = ()):
+        # bucket -> (starts, entries, longest length)
+        self._buckets: Dict[int, list] = {}
+        for entry in sorted(entries, key=lambda e: e.start):
+            bucket = self._bucket(entry)
+            bucket[0].append(entry.start)
+            bucket[1].append(entry)
+            bucket[2] = max(bucket[2], entry.end - entry.start)
+        self.loaded_at = time.monotonic()
+
+    def _bucket(self, entry: IntervalEntry) -> list:
+        return self._buckets.setdefault(max(entry.end - entry.start, 0).bit_length(), [[], [], 0])
+
+    def add(self, entry: IntervalEntry):
+        bucket = self._bucket(entry)
+        i = bisect.bisect_right(bucket[0], entry.start)
+        bucket[0].insert(i, entry.start)
+        bucket[1].insert(i, entry)
+        bucket[2] = max(bucket[2], entry.end - entry.start)
+
+    def overlapping(self, start: int, end: int) -> List[IntervalEntry]:
+        res = []
+        for starts, entries, max_length in self._buckets.values():
+            lo = bisect.bisect_right(starts, start - max_length)
+            hi = bisect.bisect_left(starts, end)
+            res.extend(e for e in entries[lo:hi] if e.end > start)
+        if len(self._buckets) > 1:
+            res.sort(key=lambda e: e.start)
+        return res
+
+
+class TimeSlotIndex:
+    """
+    In-process interval index over the TimeSlot table, keyed by user id.
+
+    Users are loaded from the table on first use. Rows created by this process are added with
+    `add`. Rows written by other processes (e.g. another Lambda container) are picked up when a
+    user's intervals are older than `max_age` seconds. At most `max_users` users are kept, the
+    least recently used ones are dropped first.
+    """
+
+    def __init__(self, max_age: Optional[float] = 60, max_users: int = 10000):
+        self.max_age = max_age
+        self.max_users = max_users
+        self._users: "OrderedDict[int, UserIntervals]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _get(self, user_id: int) -> Optional[UserIntervals]:
+        intervals = self._users.get(user_id)
+        if intervals is not None:
+            self._users.move_to_end(user_id)
+        return intervals
+
+    def _is_fresh(self, intervals: Optional[UserIntervals]) -> bool:
+        if intervals is None:
+            return False
+        return self.max_age is None or time.monotonic() - intervals.loaded_at < self.max_age
+
+    def load(self, user_ids: Iterable[int]) -> Dict[int, UserIntervals]:
+        """ Index the given users, with a single query for the ones missing or stale """
+        with self._lock:
+            res = {uid: self._get(uid) for uid in set(user_ids)}
+        missing = [uid for uid, intervals in res.items() if not self._is_fresh(intervals)]
+        if not missing:
+            return res
+
+        entries = load_entries(TimeSlot.user.in_(missing))
+        entries = {uid: entries.get(uid, []) for uid in missing}
+
+        with self._lock:
+            for uid, user_entries in entries.items():
+                res[uid] = self._users[uid] = UserIntervals(user_entries)
+                self._users.move_to_end(uid)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return res
+
+    def add(self, slot: TimeSlot):
+        with self._lock:
+            intervals = self._users.get(slot.user_id)
+            # Users not indexed yet will read the new row from the table when first loaded
+            if intervals is not None:
+                intervals.add(IntervalEntry.from_timeslot(slot))
+
+    def invalidate(self, user_id: int = None):
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def overlapping(self, user_id: int, start: int, end: int) -> List[IntervalEntry]:
+        """ Intervals of the user overlapping [start, end), in epoch seconds """
+        intervals = self.load([user_id])[user_id]
+        with self._lock:
+            return intervals.overlapping(start, end)
+
+    def users_overlapping(self, user_ids: Iterable[int], start: int, end: int,
+                          status_label: str = None) -> Dict[int, List[IntervalEntry]]:
+        """ Who overlaps [start, end): the overlapping intervals of every given user that has any """
+        res = {}
+        indexed = self.load(user_ids)
+        with self._lock:
+            for uid, intervals in indexed.items():
+                entries = intervals.overlapping(start, end)
+                if status_label is not None:
+                    entries = [e for e in entries if e.status_label == status_label]
+                if entries:
+                    res[uid] = entries
+        return res
@@ -0,0 +1,223 @@
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import pytz
+from pytz import BaseTzInfo
+
+from db.models import User, UserProfile, TimeSlot
+from models import TimeSlotInfo
+from utils import to_utc
+from scheduling.bitmap import SLOT_MINUTES, SLOT_SECONDS, SLOTS_PER_DAY, range_mask, run_mask, step_mask, runs, \
+    BitCounter
+from scheduling.intervals import TimeSlotIndex, load_entries
+
+# Suggested meetings start on the half hour
+CANDIDATE_STEP_SLOTS = 30 // SLOT_MINUTES
+DAY_MASK = range_mask(0, SLOTS_PER_DAY)
+SLOT_DELTA = datetime.timedelta(seconds=SLOT_SECONDS)
+ONE_DAY = datetime.timedelta(days=1)
+
+
+@dataclass
+class ParticipantAvailability:
+    slack_uid: str
+    user: Optional[User]
+    available: int  # bitmap of slots the participant is available
+    tentative: int  # bitmap of slots the participant may be available
+
+
+def to_slot(window_start: datetime.datetime, value: datetime.datetime, round_up=False) -> int:
+    seconds = (to_utc(value) - window_start).total_seconds()
+    if round_up:
+        return -int(-seconds // SLOT_SECONDS)
+    return int(seconds // SLOT_SECONDS)
+
+
+def profile_timezone(profile: Optional[UserProfile]) -> BaseTzInfo:
+    if profile is None:
+        return pytz.utc
+    try:
+        return pytz.timezone(profile.timezone)
+    except pytz.UnknownTimeZoneError:
+        return pytz.utc
+
+
+def working_hours_bitmap(profile: UserProfile, window_start: datetime.datetime, n_slots: int) -> int:
+    """ The profile's weekly template laid over the window, one local day at a time """
+    tz = profile_timezone(profile)
+    template = profile.weekly_bitmap()
+    window_end = window_start + datetime.timedelta(seconds=n_slots * SLOT_SECONDS)
+
+    bitmap = 0
+    midnight = datetime.datetime.combine(window_start.astimezone(tz).date(), datetime.time()) - ONE_DAY
+    last_midnight = datetime.datetime.combine(window_end.astimezone(tz).date(), datetime.time())
+    start = tz.localize(midnight)
+    while midnight <= last_midnight:
+        end = tz.localize(midnight + ONE_DAY)
+        hours = (template >> (midnight.weekday() * SLOTS_PER_DAY)) & DAY_MASK
+        if hours and end - start == ONE_DAY:
+            offset = to_slot(window_start, start, round_up=True)
+            bitmap |= hours << offset if offset >= 0 else hours >> -offset
+        elif hours:
+            # Daylight saving time starts or ends that day, each run of hours gets its own offset
+            for run_start, run_end in runs(hours):
+                bitmap |= range_mask(
+                    to_slot(window_start, tz.localize(midnight + run_start * SLOT_DELTA), round_up=True),
+                    to_slot(window_start, tz.localize(midnight + run_end * SLOT_DELTA)),
+                )
+        midnight, start = midnight + ONE_DAY, end
+    return bitmap & range_mask(0, n_slots)
+
+
+def load_participant_availability(slack_uids: Iterable[str],
+                                  window_start: datetime.datetime,
+                                  n_slots: int = SLOTS_PER_DAY,
+                                  timeslot_index: TimeSlotIndex = None) -> List[ParticipantAvailability]:
+    """
+    Build the availability bitmaps of every participant with two queries in total: one for the
+    profiles and one for the TimeSlot rows overlapping the window (skipped for users already in
+    the timeslot_index).
+    """
+    slack_uids = list(dict.fromkeys(slack_uids))
+    window_end = window_start + datetime.timedelta(seconds=n_slots * SLOT_SECONDS)
+
+    profiles: Dict[str, UserProfile] = {
+        p.user.slack_uid: p
+        for p in UserProfile.select(UserProfile, User).join(User).where(User.slack_uid.in_(slack_uids))
+    }
+
+    available = {}
+    tentative = {}
+    blocked = {}
+    for uid, profile in profiles.items():
+        available[profile.user_id] = working_hours_bitmap(profile, window_start, n_slots)
+        tentative[profile.user_id] = 0
+        blocked[profile.user_id] = 0
+
+    if profiles:
+        user_ids = [p.user_id for p in profiles.values()]
+        if timeslot_index is not None:
+            entries = timeslot_index.users_overlapping(
+                user_ids, int(window_start.timestamp()), int(window_end.timestamp()))
+        else:
+            entries = load_entries(
+                TimeSlot.user.in_(user_ids),
+                TimeSlot.start < window_end,
+                TimeSlot.end > window_start)
+
+        buckets = {"available": available, "tentative": tentative, "unavailable": blocked}
+        window_epoch = int(window_start.timestamp())
+        for user_id, user_entries in entries.items():
+            for entry in user_entries:
+                bucket = buckets.get(entry.status_label)
+                if bucket is None:
+                    continue
+                bucket[user_id] |= range_mask((entry.start - window_epoch) // SLOT_SECONDS,
+                                              min(-((window_epoch - entry.end) // SLOT_SECONDS), n_slots))
+
+    everything = range_mask(0, n_slots)
+    res = []
+    for uid in slack_uids:
+        profile = profiles.get(uid)
+        if profile is None:
+            # Nothing known about this participant yet, so never count them as available
+            res.append(ParticipantAvailability(slack_uid=uid, user=None, available=0, tentative=everything))
+            continue
+        user_id = profile.user_id
+        busy = blocked[user_id]
+        res.append(ParticipantAvailability(
+            slack_uid=uid,
+            user=profile.user,
+            available=available[user_id] & ~(busy | tentative[user_id]),
+            tentative=tentative[user_id] & ~busy,
+        ))
+    return res
+
+
+def rank_time_slots(participants: List[ParticipantAvailability],
+                    window_start: datetime.datetime,
+                    duration: datetime.timedelta,
+                    timezone: BaseTzInfo,
+                    n_slots: int = SLOTS_PER_DAY,
+                    limit: int = 6,
+                    not_before: datetime.datetime = None) -> List[TimeSlotInfo]:
+    length = max(1, -int(-duration.total_seconds() // SLOT_SECONDS))
+    if length > n_slots:
+        return []
+
+    # Valid start slots: on the candidate grid, not in the past and the meeting fits in the window
+    candidates = step_mask(n_slots - length + 1, CANDIDATE_STEP_SLOTS)
+    if not_before is not None:
+        candidates &= ~range_mask(0, to_slot(window_start, not_before, round_up=True))
+
+    fits_available = []
+    fits_soft = []
+    available_counter = BitCounter()
+    soft_counter = BitCounter()
+    for p in participants:
+        a = run_mask(p.available, length) & candidates
+        s = run_mask(p.available | p.tentative, length) & candidates
+        fits_available.append(a)
+        fits_soft.append(s)
+        available_counter.add(a)
+        soft_counter.add(s)
+
+    scored = []
+    remaining = candidates
+    while remaining:
+        slot = (remaining & -remaining).bit_length() - 1
+        remaining &= remaining - 1
+        n_available = available_counter.count(slot)
+        n_soft = soft_counter.count(slot)
+        if n_soft == 0:
+            continue
+        scored.append((-n_available, -(n_soft - n_available), slot))
+    scored.sort()
+
+    res = []
+    for _, _, slot in scored[:limit]:
+        bit = 1 << slot
+        start = window_start + datetime.timedelta(seconds=slot * SLOT_SECONDS)
+        available_users = []
+        tentative_users = []
+        unavailable_users = []
+        for p, a, s in zip(participants, fits_available, fits_soft):
+            if a & bit:
+                available_users.append(p.slack_uid)
+            elif s & bit:
+                tentative_users.append(p.slack_uid)
+            else:
+                unavailable_users.append(p.slack_uid)
+        res.append(TimeSlotInfo(
+            time_slot_id=str(int(start.timestamp())),
+            start_time=start,
+            end_time=start + duration,
+            timezone=timezone,
+            available_users=available_users,
+            tentative_users=tentative_users,
+            unavailable_users=unavailable_users,
+        ))
+    return res
+
+
+def suggest_meeting_times(slack_uids: Iterable[str],
+                          date: datetime.date,
+                          duration: datetime.timedelta,
+                          timezone: BaseTzInfo,
+                          limit: int = 6,
+                          timeslot_index: TimeSlotIndex = None) -> List[TimeSlotInfo]:
+    """
+    Suggest the best start times on the given day (in the organizer's timezone) for a meeting
+    between the given slack users, best candidates first.
+    """
+    window_start = timezone.localize(datetime.datetime.combine(date, datetime.time())).astimezone(pytz.utc)
+    participants = load_participant_availability(slack_uids, window_start, timeslot_index=timeslot_index)
+    return rank_time_slots(
+        participants,
+        window_start,
+        duration,
+        timezone,
+        limit=limit,
+        not_before=datetime.datetime.now(pytz.utc),
+    )
@@ -0,0 +1,135 @@
+"""
+Catalogue of common timezones grouped by their current UTC offset, used for the timezone
+option groups of the profile modals.
+
+The catalogue is built on first use and rebuilt once it expires, which is at the next DST
+transition of any common timezone (offsets, hence groups, change then) or after max_age.
+A snapshot can be dumped at build time and shipped with the Lambda bundle:
+
+    python bot/timezones.py bot/timezones.json
+"""
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pytz
+
+from utils import utc_offset_to_common_timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_PATH = os.environ.get(
+    "TIMEZONE_CATALOGUE_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "timezones.json"),
+)
+
+
+def _offset_at(tz, dt: datetime) -> timedelta:
+    return dt.astimezone(tz).utcoffset()
+
+
+def next_offset_change(dt: datetime, horizon: timedelta = timedelta(days=400),
+                       step: timedelta = timedelta(days=1)) -> Optional[datetime]:
+    """
+    Earliest DST/offset transition of any common timezone after dt and within horizon.
+
+    Offsets are sampled every step (no zone changes its offset twice within a day), a change
+    between two samples is then narrowed down to the minute. Fixed-offset zones never change.
+    """
+    now = dt.astimezone(pytz.utc).replace(second=0, microsecond=0)
+    earliest = None
+    for name in pytz.common_timezones:
+        tz = pytz.timezone(name)
+        offset = _offset_at(tz, now)
+        # Only the part before the earliest transition found so far is worth scanning
+        until = earliest or now + horizon
+        before, after = now, now + step
+        while before < until and _offset_at(tz, after) == offset:
+            before, after = after, after + step
+        if before >= until:
+            continue
+        while after - before > timedelta(minutes=1):
+            middle = (before + (after - before) / 2).replace(second=0, microsecond=0)
+            if _offset_at(tz, middle) == offset:
+                before = middle
+            else:
+                after = middle
+        if earliest is None or after < earliest:
+            earliest = after
+    return earliest
+
+
+class TimezoneCatalogue:
+    def __init__(self, max_age: timedelta = timedelta(hours=12), snapshot_path: str = None):
+        self.max_age = max_age
+        self.snapshot_path = snapshot_path
+
+        self._zones: Optional[Dict[timedelta, List[str]]] = None
+        # Offsets are valid until the next transition, the catalogue is rebuilt at the latest by max_age
+        self._valid_until: Optional[datetime] = None
+        self._expires_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Dict[timedelta, List[str]]:
+        """ UTC offset -> common timezone names. A new dict is returned after every rebuild. """
+        now = datetime.now(pytz.utc)
+        zones = self._zones
+        if zones is not None and now < self._expires_at:
+            return zones
+
+        with self._lock:
+            if self._zones is None or now >= self._expires_at:
+                if self._zones is not None or not self.load(self.snapshot_path, now):
+                    self.build(now)
+            return self._zones
+
+    def build(self, now: datetime = None):
+        now = now or datetime.now(pytz.utc)
+        zones = utc_offset_to_common_timezone(now)
+        valid_until = next_offset_change(now)
+        self._set(zones, valid_until, now)
+
+    def _set(self, zones: Dict[timedelta, List[str]], valid_until: Optional[datetime], now: datetime):
+        # get() reads _zones then _expires_at without the lock, _zones is replaced last
+        self._valid_until = valid_until
+        self._expires_at = min(filter(None, [now + self.max_age, valid_until]))
+        self._zones = zones
+
+    def load(self, path: Optional[str], now: datetime = None) -> bool:
+        """ Use the snapshot at path if it is still valid """
+        now = now or datetime.now(pytz.utc)
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+            valid_until = datetime.fromisoformat(snapshot["valid_until"]) if snapshot["valid_until"] else None
+            zones = {timedelta(seconds=offset): tzs for offset, tzs in snapshot["zones"]}
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring invalid timezone catalogue snapshot {path}: {e}")
+            return False
+
+        if valid_until and now >= valid_until:
+            return False
+        self._set(zones, valid_until, now)
+        return True
+
+    def dump(self, path: str):
+        self.get()
+        with open(path, "w") as f:
+            json.dump({
+                "generated_at": datetime.now(pytz.utc).isoformat(),
+                "valid_until": self._valid_until.isoformat() if self._valid_until else None,
+                "zones": [[int(offset.total_seconds()), tzs] for offset, tzs in self._zones.items()],
+            }, f)
+
+
+timezone_catalogue = TimezoneCatalogue(snapshot_path=DEFAULT_SNAPSHOT_PATH)
+
+
+if __name__ == '__main__':
+    TimezoneCatalogue().dump(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SNAPSHOT_PATH)
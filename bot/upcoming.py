@@ -0,0 +1,73 @@
+"""
+Per-user projection of the meetings shown on the Home tab.
+
+UpcomingMeeting holds one row per participant and meeting, indexed by (user, meeting_start), so
+the Home tab reads a bounded range of one user's rows instead of joining meetings, participants
+and answers on every app_home_opened. Code changing a meeting, its participants or their answers
+updates the projection through the functions below.
+"""
+import datetime
+from typing import List, Optional
+
+from peewee import Value
+
+from db.database import database_runtime
+from db.models import Meeting, MeetingParticipant, UpcomingMeeting, User
+from utils import to_utc
+
+HOME_UPCOMING_MEETINGS = 5
+
+
+def project_meeting(meeting: Meeting, organizer_uid: Optional[str]):
+    """ (Re)build the rows of every participant of the meeting """
+    with database_runtime.atomic():
+        UpcomingMeeting.delete().where(UpcomingMeeting.meeting == meeting).execute()
+        UpcomingMeeting.insert_from(
+            MeetingParticipant.select(
+                MeetingParticipant.user, Value(meeting.id), Value(meeting.title),
+                Value(meeting.meeting_start, converter=UpcomingMeeting.meeting_start.db_value),
+                Value(meeting.meeting_end, converter=UpcomingMeeting.meeting_end.db_value),
+                Value(organizer_uid), MeetingParticipant.rsvp,
+            ).where(MeetingParticipant.meeting == meeting),
+            fields=[UpcomingMeeting.user, UpcomingMeeting.meeting, UpcomingMeeting.title,
+                    UpcomingMeeting.meeting_start, UpcomingMeeting.meeting_end, UpcomingMeeting.organizer_uid,
+                    UpcomingMeeting.rsvp],
+        ).execute()
+
+
+def reschedule_meeting(meeting: Meeting, start: datetime.datetime, end: datetime.datetime):
+    """ Move the meeting and the rows of its participants """
+    with database_runtime.atomic():
+        meeting.epoch = int(to_utc(start).timestamp())
+        meeting.meeting_start = start
+        meeting.meeting_end = end
+        meeting.save(only=[Meeting.epoch, Meeting.meeting_start, Meeting.meeting_end])
+        UpcomingMeeting.update(meeting_start=start, meeting_end=end) \
+            .where(UpcomingMeeting.meeting == meeting).execute()
+
+
+def cancel_meeting(meeting: Meeting):
+    """ Delete the meeting with its participants and their rows """
+    with database_runtime.atomic():
+        UpcomingMeeting.delete().where(UpcomingMeeting.meeting == meeting).execute()
+        MeetingParticipant.delete().where(MeetingParticipant.meeting == meeting).execute()
+        meeting.delete_instance()
+
+
+def set_rsvp(participant: MeetingParticipant):
+    UpcomingMeeting.update(rsvp=participant.rsvp).where(
+        UpcomingMeeting.meeting == participant.meeting_id, UpcomingMeeting.user == participant.user_id,
+    ).execute()
+
+
+def upcoming_meetings(slack_uid: str, now: datetime.datetime = None,
+                      limit: int = HOME_UPCOMING_MEETINGS) -> List[UpcomingMeeting]:
+    """ Next meetings of the user, soonest first """
+    now = now or datetime.datetime.utcnow()
+    user_id = User.select(User.id).where(User.slack_uid == slack_uid)
+    return list(
+        UpcomingMeeting.select()
+        .where(UpcomingMeeting.user == user_id, UpcomingMeeting.meeting_start >= now)
+        .order_by(UpcomingMeeting.meeting_start)
+        .limit(limit)
+    )
@@ -1,13 +1,14 @@
+import calendar
 from collections import defaultdict
-from datetime import datetime
-from typing import Dict
+from datetime import datetime, timedelta
+from typing import Dict, List
 
 import pytz
 from datetime import tzinfo
 
 
-def utc_offset_to_common_timezone() -> Dict[str, str]:
-    dt = datetime.now(pytz.utc)
+def utc_offset_to_common_timezone(dt: datetime = None) -> Dict[timedelta, List[str]]:
+    dt = dt or datetime.now(pytz.utc)
     zone_names = defaultdict(list)
     for tz in pytz.common_timezones:
         zone_names[dt.astimezone(pytz.timezone(tz)).utcoffset()].append(tz)
@@ -21,6 +22,24 @@ def utc_offset_to_common_timezone() -> Dict[str, str]:
     return zone_names
 
 
+def to_utc(value) -> datetime:
+    # DateTimeField hands back strings for tz-aware values stored in sqlite
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return pytz.utc.localize(value)
+    return value.astimezone(pytz.utc)
+
+
+def to_epoch_minute(value: datetime) -> int:
+    """ Minutes since the epoch, naive datetimes are in UTC """
+    return calendar.timegm(value.utctimetuple()) // 60
+
+
+def from_epoch_minute(minute: int) -> datetime:
+    return datetime.fromtimestamp(minute * 60, pytz.utc)
+
+
 def tz_to_abbr(tz: pytz.BaseTzInfo):
     abbr = tz.localize(datetime.now(), is_dst=None)
     return abbr.tzname()
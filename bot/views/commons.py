@@ -1,8 +1,8 @@
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from slack_sdk.models.blocks import Block, Option, OptionGroup
 
-from utils import utc_offset_to_common_timezone
+from timezones import timezone_catalogue
 
 
 class Blocks:
@@ -23,35 +23,67 @@ class WeekdayOptionsMixin:
         Option(value="32", text="Saturday"),
         Option(value="64", text="Sunday"),
     ]
+    # magic -> option
+    working_days_option_index = {int(day.value): day for day in working_days_options}
 
     @classmethod
-    def to_working_days_option(cls, working_day_magic: int):
-        working_day_magic = int(working_day_magic)
-        for day in cls.working_days_options:
-            if int(day.value) == working_day_magic:
-                return day
-        else:
-            return None
+    def to_working_days_option(cls, working_day_magic: int) -> Optional[Option]:
+        return cls.working_days_option_index.get(int(working_day_magic))
 
     @classmethod
-    def to_working_days_options(cls, working_day_magics: List[int]) -> List[Option]:
-        return [cls.to_working_days_option(m) for m in working_day_magics]
+    def to_working_days_options(cls, working_day_magics: Iterable[int]) -> List[Option]:
+        index = cls.working_days_option_index
+        options = [index.get(int(m)) for m in working_day_magics]
+        return [option for option in options if option]
+
+
+class TimezoneOptions:
+    """
+    Option groups of timezone_catalogue and the timezone -> option index, (re)built on access
+    whenever the catalogue was rebuilt. Reads as the option groups when used as a class attribute.
+    """
+
+    def __init__(self):
+        self._built: Tuple[Optional[dict], List[OptionGroup], Dict[str, Option]] = (None, [], {})
+
+    def _refresh(self) -> Tuple[Optional[dict], List[OptionGroup], Dict[str, Option]]:
+        zones = timezone_catalogue.get()
+        if zones is not self._built[0]:
+            option_groups = [
+                OptionGroup(
+                    label=f"UTC{offset}",
+                    options=[Option(label=tz, value=tz) for tz in tzs],
+                )
+                for offset, tzs in zones.items()
+            ]
+            index = {option.value: option for group in option_groups for option in group.options}
+            self._built = (zones, option_groups, index)
+        return self._built
+
+    @property
+    def option_groups(self) -> List[OptionGroup]:
+        return self._refresh()[1]
+
+    @property
+    def index(self) -> Dict[str, Option]:
+        return self._refresh()[2]
+
+    def __get__(self, instance, owner) -> List[OptionGroup]:
+        return self.option_groups
+
+
+timezone_options = TimezoneOptions()
 
 
 class TimezoneOptionGroupsMixin:
-    timezone_option_groups = [
-        OptionGroup(
-            label=f"UTC{offset}",
-            options=[Option(label=tz, value=tz) for tz in tzs],
-        )
-        for offset, tzs in utc_offset_to_common_timezone().items()
-    ]
+    timezone_option_groups = timezone_options
+
+    @classmethod
+    def to_timezone_option(cls, timezone: str) -> Optional[Option]:
+        return timezone_options.index.get(timezone)
 
     @classmethod
-    def to_timezone_option(cls, timezone: str):
-        for group in cls.timezone_option_groups:
-            for option in group.options:
-                if option.value == timezone:
-                    return option
-        else:
-            return None
+    def to_timezone_options(cls, timezones: Iterable[str]) -> List[Option]:
+        index = timezone_options.index
+        options = [index.get(tz) for tz in timezones]
+        return [option for option in options if option]
@@ -1,11 +1,13 @@
 import datetime
 from typing import List
 
+import pytz
 from slack_sdk.models.blocks import *
 from slack_sdk.models.views import View
 
 from views.commons import Blocks, WeekdayOptionsMixin
-from models import button, inputs, static_select, option, hardcode, hardcode_after, hardcode_meeting
+from models import button, inputs, static_select, option, hardcode, hardcode_after
+from utils import to_utc
 
 class HomeMyAvailabilityView(Blocks):
     def __init__(self, filter_availability_result: Blocks = None):
@@ -65,6 +67,37 @@ class HomeMyAvailabilityView(Blocks):
         )
 
 
+class HomeUpcomingMeetingsView(Blocks):
+    rsvp_texts = {"yes": "Going", "maybe": "Maybe", "no": "Not going", None: "Not answered yet"}
+
+    def __init__(self, upcoming_meetings: List = None, timezone: pytz.BaseTzInfo = pytz.utc):
+        """ upcoming_meetings: UpcomingMeeting rows of the user, shown in their timezone """
+        _blocks = [
+            HeaderBlock(text=PlainTextObject(text="Upcoming meetings")),
+        ]
+        for meeting in upcoming_meetings or []:
+            start = to_utc(meeting.meeting_start).astimezone(timezone)
+            end = to_utc(meeting.meeting_end).astimezone(timezone)
+            _blocks += [
+                SectionBlock(text=MarkdownTextObject(text=f"*{meeting.title}*")),
+                ContextBlock(elements=[
+                    PlainTextObject(text=f"{start.strftime('%-I:%M%p')} - {end.strftime('%-I:%M%p')} ({start.tzname()})"),
+                    PlainTextObject(text=start.strftime("%m/%d/%Y")),
+                ]),
+                ContextBlock(elements=[
+                    MarkdownTextObject(
+                        text=(f"Scheduled by <@{meeting.organizer_uid}> · " if meeting.organizer_uid else "")
+                             + self.rsvp_texts.get(meeting.rsvp, self.rsvp_texts[None])),
+                ]),
+            ]
+        if not upcoming_meetings:
+            _blocks.append(ContextBlock(elements=[PlainTextObject(text="No upcoming meetings")]))
+
+        super().__init__(
+            blocks=_blocks,
+        )
+
+
 class HomeEditAvailabilityModal(View, WeekdayOptionsMixin):
     def __init__(self,
                  blks=None,
@@ -125,7 +158,7 @@ class HomeEditAvailabilityModal(View, WeekdayOptionsMixin):
 
 
 class HomeView(View):
-    def __init__(self, before=True):
+    def __init__(self, before=True, upcoming_meetings: List = None, timezone: pytz.BaseTzInfo = pytz.utc):
         tmp = hardcode() if before else hardcode_after()
         super().__init__(
             external_id="home",
@@ -159,10 +192,7 @@ class HomeView(View):
                     ]
                 ),
                 DividerBlock(),
-                HeaderBlock(
-                    text=PlainTextObject(text="Upcoming meetings"),
-                ),
-                *hardcode_meeting(),
+                *HomeUpcomingMeetingsView(upcoming_meetings, timezone),
                 DividerBlock(),
                 *HomeMyAvailabilityView(),
                 *tmp
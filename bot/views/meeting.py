@@ -1,5 +1,5 @@
 import datetime
-from typing import List
+from typing import Dict, List
 
 import pytz
 from slack_sdk.models.attachments import BlockAttachment
@@ -13,6 +13,11 @@ from views.commons import Blocks
 
 PLACE_HOLDER_IMG = "https://cdn.pixabay.com/photo/2021/12/19/14/36/bird-6881277_1280.jpg"
 
+# Context blocks hold at most 10 elements, the text included
+MAX_CONTEXT_AVATARS = 5
+# Users mentioned by name in a status line, text objects are limited to 3000 characters
+MAX_MENTIONS = 20
+
 
 class MeetingParticipantActionView(Blocks):
     modes = {"questionnaire", "status"}
@@ -31,40 +36,61 @@ class MeetingParticipantActionView(Blocks):
                  attend_users: List[str] = None,
                  may_attend_users: List[str] = None,
                  wont_attend_users: List[str] = None,
-                 pending_users: List[str] = None):
+                 pending_users: List[str] = None,
+                 avatar_urls: Dict[str, str] = None,
+                 meeting_id: int = None):
+        """
+        avatar_urls: slack uid -> avatar image url, a placeholder is shown for users without one
+        meeting_id: handed to the listeners of the buttons as their value
+        """
 
         if mode not in self.modes:
             raise NotImplementedError
 
+        def mentions(uids: List[str]) -> str:
+            text = ", ".join([f"<@{uid}>" for uid in uids[:MAX_MENTIONS]])
+            if len(uids) > MAX_MENTIONS:
+                text += f" and {len(uids) - MAX_MENTIONS} more"
+            return text
+
+        def avatars(uids: List[str], alt_text: str) -> List[ImageElement]:
+            urls = [avatar_urls[uid] for uid in uids if avatar_urls and avatar_urls.get(uid)]
+            return [
+                ImageElement(image_url=url, alt_text=alt_text)
+                for url in urls[:MAX_CONTEXT_AVATARS] or [PLACE_HOLDER_IMG]
+            ]
+
+        value = str(meeting_id) if meeting_id is not None else None
+
         if mode == "questionnaire":
             section = [
                 HeaderBlock(text="Going?"),
                 ActionsBlock(
                     elements=[
-                        ButtonElement(text="Yes", action_id=self.meeting_part_quest_yes),
-                        ButtonElement(text="No", action_id=self.meeting_part_quest_no),
-                        ButtonElement(text="Maybe", action_id=self.meeting_part_quest_maybe),
+                        ButtonElement(text="Yes", action_id=self.meeting_part_quest_yes, value=value),
+                        ButtonElement(text="No", action_id=self.meeting_part_quest_no, value=value),
+                        ButtonElement(text="Maybe", action_id=self.meeting_part_quest_maybe, value=value),
                     ]
                 ),
             ]
 
             if attend_users:
                 section.append(ContextBlock(elements=[
-                    ImageElement(image_url=PLACE_HOLDER_IMG, alt_text="attend_users"),
+                    *avatars(attend_users, "attend_users"),
                     PlainTextObject(
                         text=f"{len(attend_users)} team member{'s' if len(attend_users) > 1 else ''} will attend"),
                 ]))
 
             if may_attend_users:
                 section.append(ContextBlock(elements=[
-                    ImageElement(image_url=PLACE_HOLDER_IMG, alt_text="may_attend_users"),
+                    *avatars(may_attend_users, "may_attend_users"),
                     PlainTextObject(
                         text=f"{len(may_attend_users)} team member{'s' if len(may_attend_users) > 1 else ''} may attend"),
                 ]))
 
             if wont_attend_users:
                 section.append(ContextBlock(elements=[
-                    ImageElement(image_url=PLACE_HOLDER_IMG, alt_text="attend_users"),
+                    *avatars(wont_attend_users, "wont_attend_users"),
                     PlainTextObject(
                         text=f"{len(wont_attend_users)} team member{'s' if len(wont_attend_users) > 1 else ''} will not attend"),
                 ]))
@@ -75,27 +101,27 @@ class MeetingParticipantActionView(Blocks):
             ]
             if attend_users:
                 section.append(ContextBlock(elements=[
-                    ImageElement(image_url=PLACE_HOLDER_IMG, alt_text="attend_users"),
+                    *avatars(attend_users, "attend_users"),
                     MarkdownTextObject(
-                        text="Confirmed: " + ", ".join([f"<@{uid}>" for uid in attend_users])),
+                        text="Confirmed: " + mentions(attend_users)),
                 ]))
             if may_attend_users:
                 section.append(ContextBlock(elements=[
-                    ImageElement(image_url=PLACE_HOLDER_IMG, alt_text="may_attend_users"),
+                    *avatars(may_attend_users, "may_attend_users"),
                     MarkdownTextObject(
-                        text="Maybe: " + ", ".join([f"<@{uid}>" for uid in may_attend_users])),
+                        text="Maybe: " + mentions(may_attend_users)),
                 ]))
             if wont_attend_users:
                 section.append(ContextBlock(elements=[
-                    ImageElement(image_url=PLACE_HOLDER_IMG, alt_text="wont_attend_users"),
+                    *avatars(wont_attend_users, "wont_attend_users"),
                     MarkdownTextObject(
-                        text="Not coming: " + ", ".join([f"<@{uid}>" for uid in wont_attend_users])),
+                        text="Not coming: " + mentions(wont_attend_users)),
                 ]))
             if pending_users:
                 section.append(ContextBlock(elements=[
-                    ImageElement(image_url=PLACE_HOLDER_IMG, alt_text="pending_users"),
+                    *avatars(pending_users, "pending_users"),
                     MarkdownTextObject(
-                        text="Waiting for response: " + ", ".join([f"<@{uid}>" for uid in pending_users])),
+                        text="Waiting for response: " + mentions(pending_users)),
                 ]))
 
             section.append(
@@ -104,9 +130,10 @@ class MeetingParticipantActionView(Blocks):
             section.append(
                 ActionsBlock(
                     elements=[
-                        ButtonElement(text="Send Reminder", action_id=self.meeting_part_summary_send_reminder),
-                        ButtonElement(text="Reschedule", action_id=self.meeting_part_summary_reschedule),
-                        ButtonElement(text="Cancel", action_id=self.meeting_part_summary_cancel),
+                        ButtonElement(text="Send Reminder", action_id=self.meeting_part_summary_send_reminder,
+                                      value=value),
+                        ButtonElement(text="Reschedule", action_id=self.meeting_part_summary_reschedule, value=value),
+                        ButtonElement(text="Cancel", action_id=self.meeting_part_summary_cancel, value=value),
                     ]
                 ),
             )
@@ -256,31 +283,55 @@ class CreateMeetingModal(View):
 
 class CreateMeetingTimeSuggestionModal(View):
     def __init__(self,
-                 time_slot_infos: List[TimeSlotInfo] = None):
+                 time_slot_infos: List[TimeSlotInfo] = None,
+                 external_id: str = None,
+                 loading: bool = False,
+                 private_metadata: str = None,
+                 callback_id: str = "meeting_create_meeting_suggest_time_submit"):
+        """
+        private_metadata: the meeting being created, handed over to the submission
+        callback_id: of the submission, the create meeting one unless a meeting is rescheduled
+        """
+        time_slot_infos = time_slot_infos or []
+
+        if loading:
+            super().__init__(
+                type="modal",
+                title=PlainTextObject(text="Meeting Time"),
+                close=PlainTextObject(text="Back"),
+                external_id=external_id,
+                blocks=[SectionBlock(text=MarkdownTextObject(
+                    text=":hourglass_flowing_sand: Finding the best time slots for everyone..."
+                ))],
+            )
+            return
+
+        suggested_options = [
+            Option(
+                value=t.time_slot_id,
+                description=MarkdownTextObject(
+                    text=f"Unavailable: {len(t.unavailable_users)} users",
+                ),
+                text=MarkdownTextObject(
+                    text=f"*{t.start_time.astimezone(t.timezone).strftime('%-I:%M%p')} - {t.end_time.astimezone(t.timezone).strftime('%-I:%M%p')} ({tz_to_abbr(t.timezone)})*\n"
+                         f"Available: {len(t.available_users)} users \n"
+                    # f"{self.render_users_list(t.available_users)}\n"
+                         f"Tentative: {len(t.tentative_users)} users"
+                    # f"{self.render_users_list(t.tentative_users)}\n"
+                    # Option text is limited to 75 characters, unavailable users are in the description
+                )
+            )
+            for t in time_slot_infos[: 2 if len(time_slot_infos) > 2 else len(time_slot_infos)]
+        ]
 
         blocks = [
             SectionBlock(
                 text=MarkdownTextObject(text="*Suggested Time Slots*"),
                 accessory=RadioButtonsElement(
                     action_id="meeting_create_meeting_time_suggestion_suggest_select",
-                    options=[
-                        Option(
-                            value=t.time_slot_id,
-                            description=MarkdownTextObject(
-                                text=f"Unavailable: {len(t.unavailable_users)} users",
-                            ),
-                            text=MarkdownTextObject(
-                                text=f"*{t.start_time.astimezone(t.timezone).strftime('%-I:%M%p')} - {t.end_time.astimezone(t.timezone).strftime('%-I:%M%p')} ({tz_to_abbr(t.timezone)})*\n"
-                                     f"Available: {len(t.available_users)} users \n"
-                                # f"{self.render_users_list(t.available_users)}\n"
-                                     f"Tentative: {len(t.tentative_users)} users \n"
-                                # f"{self.render_users_list(t.tentative_users)}\n"
-                                     f"Unavailable: {len(t.unavailable_users)} users"
-                                # f"{self.render_users_list(t.unavailable_users)}\n"
-                            )
-                        )
-                        for t in time_slot_infos[: 2 if len(time_slot_infos) > 2 else len(time_slot_infos)]
-                    ]
+                    options=suggested_options,
+                    # Something is always picked when the modal is submitted
+                    initial_option=suggested_options[0],
                 )
             ) if time_slot_infos else SectionBlock(text=MarkdownTextObject(
                 text="Oh oh, seems like there's no handy time we can suggest for you :disappointed:"
@@ -310,7 +361,9 @@ class CreateMeetingTimeSuggestionModal(View):
             title=PlainTextObject(text="Meeting Time"),
             close=PlainTextObject(text="Back"),
             submit=PlainTextObject(text="Confirm"),
-            callback_id="meeting_create_meeting_suggest_time_submit",
+            callback_id=callback_id,
+            external_id=external_id,
+            private_metadata=private_metadata,
             blocks=blocks,
         )
 
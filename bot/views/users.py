@@ -69,8 +69,8 @@ class SetProfileModal(View, WeekdayOptionsMixin, TimezoneOptionGroupsMixin):
                     element=StaticMultiSelectElement(
                         action_id="users_set_profile_working_days_multi_select",
                         options=self.working_days_options,
-                        initial_options=[self.to_working_days_option(m) for m in
-                                         working_days_magics] if working_days_magics else None
+                        initial_options=self.to_working_days_options(
+                            working_days_magics) if working_days_magics else None
                     ),
                 ),
                 InputBlock(
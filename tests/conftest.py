@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+BOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot")
+if BOT_DIR not in sys.path:
+    sys.path.insert(0, BOT_DIR)
+
+from db.database import conn_sqlite_database  # noqa: E402
+from db.utils import init_db_if_not  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """ Migrated in-memory SQLite database, bound to the models for the test """
+    database = conn_sqlite_database(":memory:")
+    init_db_if_not(database)
+    yield database
+    database.close()
@@ -0,0 +1,55 @@
+import random
+
+from scheduling.bitmap import BitCounter, range_mask, run_mask, step_mask
+
+
+def bits(bitmap: int) -> list:
+    return [i for i in range(bitmap.bit_length()) if bitmap >> i & 1]
+
+
+def test_range_mask():
+    assert bits(range_mask(2, 5)) == [2, 3, 4]
+    assert range_mask(3, 3) == 0
+    assert range_mask(5, 2) == 0
+    # Clipped at 0, e.g. an interval starting before the window
+    assert bits(range_mask(-3, 2)) == [0, 1]
+    assert range_mask(-5, -1) == 0
+
+
+def test_run_mask():
+    bitmap = range_mask(0, 3) | range_mask(5, 12)
+    assert run_mask(bitmap, 1) == bitmap
+    assert bits(run_mask(bitmap, 3)) == [0, 5, 6, 7, 8, 9]
+    assert bits(run_mask(bitmap, 7)) == [5]
+    assert run_mask(bitmap, 8) == 0
+
+
+def test_run_mask_matches_a_scan():
+    rng = random.Random(0)
+    for _ in range(200):
+        bitmap = rng.getrandbits(100)
+        length = rng.randint(1, 20)
+        expected = [i for i in range(100) if all(bitmap >> j & 1 for j in range(i, i + length))]
+        assert bits(run_mask(bitmap, length)) == expected
+
+
+def test_step_mask():
+    assert bits(step_mask(20, 6)) == [0, 6, 12, 18]
+    assert bits(step_mask(20, 6, offset=4)) == [4, 10, 16]
+    assert step_mask(0, 6) == 0
+
+
+def test_bit_counter_counts_every_slot():
+    rng = random.Random(1)
+    bitmaps = [rng.getrandbits(64) for _ in range(37)]
+    counter = BitCounter()
+    for bitmap in bitmaps:
+        counter.add(bitmap)
+    for slot in range(64):
+        assert counter.count(slot) == sum(bitmap >> slot & 1 for bitmap in bitmaps)
+
+
+def test_bit_counter_empty():
+    counter = BitCounter()
+    counter.add(0)
+    assert counter.count(0) == 0
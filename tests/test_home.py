@@ -0,0 +1,47 @@
+import datetime
+from types import SimpleNamespace
+
+import pytz
+
+import listeners
+from caches import HomeTabCache
+from db.models import User, Meeting, MeetingParticipant
+from listeners import publish_home
+from upcoming import project_meeting
+from views.home import HomeView
+
+
+class FakeClient:
+    def __init__(self):
+        self.published = []
+
+    def views_publish(self, user_id, view):
+        self.published.append((user_id, view))
+
+
+def test_home_is_published_again_only_when_it_changed(db, monkeypatch):
+    user = User.create(slack_uid="U1")
+    client = FakeClient()
+    runtime = SimpleNamespace(home_cache=HomeTabCache())
+    renders = []
+    monkeypatch.setattr(listeners, "HomeView", lambda **kwargs: renders.append(kwargs) or HomeView(**kwargs))
+
+    assert publish_home(runtime, client, "U1")
+    shown = client.published[-1][1]
+    assert not publish_home(runtime, client, "U1", shown)
+    # The same data is not rendered twice
+    assert len(renders) == 1
+    # Another process, without the render, compares the digest it computes
+    assert not publish_home(SimpleNamespace(home_cache=HomeTabCache()), client, "U1", shown)
+
+    # A meeting created by another process, nothing but the database tells this one
+    start = pytz.utc.localize(datetime.datetime.utcnow() + datetime.timedelta(days=1))
+    meeting = Meeting.create(epoch=0, title="Weekly Sync", meeting_start=start,
+                             meeting_end=start + datetime.timedelta(hours=1), frequency="0", organizer=user)
+    MeetingParticipant.create(user=user, meeting=meeting)
+    project_meeting(meeting, "U1")
+
+    assert publish_home(runtime, client, "U1", shown)
+    assert "Weekly Sync" in str(client.published[-1][1])
+    assert len(client.published) == 2
+    assert len(renders) == 3
@@ -0,0 +1,62 @@
+import datetime
+import random
+
+import pytz
+
+from db.models import User, TimeSlot
+from scheduling.intervals import IntervalEntry, TimeSlotIndex, UserIntervals
+
+
+def random_entries(rng, n):
+    entries = []
+    for i in range(n):
+        start = rng.randrange(0, 10 ** 6)
+        length = rng.choice([0, rng.randrange(1, 600), rng.randrange(600, 10 ** 4), rng.randrange(10 ** 4, 10 ** 6)])
+        entries.append(IntervalEntry(i, start, start + length, "available"))
+    return entries
+
+
+def test_overlapping_matches_a_scan():
+    rng = random.Random(0)
+    entries = random_entries(rng, 500)
+    intervals = UserIntervals(entries[:300])
+    for entry in entries[300:]:
+        intervals.add(entry)
+
+    for _ in range(300):
+        start = rng.randrange(-1000, 10 ** 6)
+        end = start + rng.randrange(1, 5000)
+        expected = sorted((e for e in entries if e.start < end and e.end > start), key=lambda e: (e.start, e.slot_id))
+        assert sorted(intervals.overlapping(start, end), key=lambda e: (e.start, e.slot_id)) == expected
+
+
+def test_long_interval_does_not_widen_the_short_ones():
+    short = [IntervalEntry(i, i * 600, i * 600 + 300, "available") for i in range(1000)]
+    long = IntervalEntry(-1, 0, 600 * 1000, "unavailable")
+    intervals = UserIntervals(short + [long])
+
+    # Only the bucket of the long interval reaches back to its start
+    starts, entries, max_length = intervals._buckets[(300).bit_length()]
+    assert max_length == 300
+    assert intervals.overlapping(500 * 600, 500 * 600 + 1) == [long, short[500]]
+
+
+def test_index_evicts_least_recently_used_users(db):
+    users = [User.create(slack_uid=f"U{i}") for i in range(3)]
+    start = pytz.utc.localize(datetime.datetime(2026, 6, 10, 9))
+    slots = [
+        TimeSlot.create(user=user, type="availability", start=start, end=start + datetime.timedelta(hours=1),
+                        status_label="available")
+        for user in users
+    ]
+
+    index = TimeSlotIndex(max_users=2)
+    index.load([users[0].id])
+    index.load([users[1].id])
+    index.load([users[0].id])  # users[1] is now the least recently used
+    index.load([users[2].id])
+    assert list(index._users) == [users[0].id, users[2].id]
+
+    window = int(start.timestamp()), int(start.timestamp()) + 60
+    assert [e.slot_id for e in index.overlapping(users[1].id, *window)] == [slots[1].id]
+    assert len(index._users) == 2
@@ -0,0 +1,66 @@
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+
+import logs
+from logs import JsonFormatter, RedactingQueueHandler, SampleFilter, flush_logging
+
+
+def make_logger(name, sample_rate=1.0):
+    records = queue.SimpleQueue()
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.handlers = [RedactingQueueHandler(records, redact_fields=("token",), max_field_length=4)]
+    logger.filters = [SampleFilter(sample_rate)]
+    logger.setLevel(logging.INFO)
+    return logger, records
+
+
+def test_body_is_redacted_before_it_is_queued():
+    logger, records = make_logger("tests.logs.redact")
+    body = {"token": "xoxb-secret", "view": {"blocks": [1, 2, 3, 4, 5]}, "user": {"id": "U1"}}
+    logger.info("Slack request", extra={"body": body})
+
+    # A listener rewriting the payload after the request was logged
+    body["view"]["blocks"] = []
+    body["user"]["name"] = "later"
+    body["added"] = True
+
+    logged = json.loads(JsonFormatter().format(records.get_nowait()))
+    assert logged["message"] == "Slack request"
+    assert logged["body"] == {"token": "[REDACTED]", "view": {"blocks": [1, 2, 3, 4, "... 1 more"]},
+                              "user": {"id": "U1"}}
+
+
+def test_sampled_out_records_are_not_queued():
+    logger, records = make_logger("tests.logs.sampled", sample_rate=0.0)
+    logger.info("Slack request", extra={"body": {}})
+    logger.warning("Failed Slack request", extra={"body": {}})
+
+    assert records.get_nowait().levelno == logging.WARNING
+    assert records.empty()
+
+
+def test_flush_logging_writes_queued_records(monkeypatch):
+    stream = io.StringIO()
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    listener = QueueListener(records, handler)
+    monkeypatch.setattr(logs, "_listener", listener)
+    listener.start()
+    try:
+        logger, _ = make_logger("tests.logs.flush")
+        logger.handlers = [RedactingQueueHandler(records)]
+        logger.info("Slack request", extra={"body": {}})
+
+        flush_logging()
+        assert json.loads(stream.getvalue())["message"] == "Slack request"
+        # Still running for the next invocation
+        logger.info("Next request")
+        flush_logging()
+        assert stream.getvalue().count("\n") == 2
+    finally:
+        listener.stop()
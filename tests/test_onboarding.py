@@ -0,0 +1,51 @@
+from db.models import User, UserProfile, UserImportState
+from onboarding import import_members, import_workspace_users
+
+
+def member(uid, **fields):
+    return {"id": uid, "tz": "Europe/Paris", **fields}
+
+
+class FakeClient:
+    """ users.list over members, page_size at a time """
+
+    def __init__(self, members):
+        self.members = members
+        self.retry_handlers = []
+
+    def auth_test(self):
+        return {"team_id": "T1"}
+
+    def users_list(self, cursor=None, limit=200):
+        start = int(cursor or 0)
+        end = start + limit
+        next_cursor = str(end) if end < len(self.members) else ""
+        return {"members": self.members[start:end], "response_metadata": {"next_cursor": next_cursor}}
+
+
+def test_import_members_counts_created_users(db):
+    User.create(slack_uid="U1")
+    members = [member("U1"), member("U2"), member("U3"), member("B1", is_bot=True), member("U4", deleted=True)]
+
+    assert import_members(members) == 2
+    assert import_members(members) == 0
+    assert User.select().count() == 3
+    assert UserProfile.get(UserProfile.user == User.get(slack_uid="U2")).timezone == "Europe/Paris"
+
+
+def test_resumed_import_does_not_count_members_twice(db):
+    client = FakeClient([member(f"U{i}") for i in range(5)])
+    # An import stopped after its first page, while two members of the next ones signed up themselves
+    import_members(client.members[:2])
+    UserImportState.create(team_id="T1", cursor="2", imported=2)
+    User.create(slack_uid="U2")
+    User.create(slack_uid="U3")
+
+    state = import_workspace_users(db, client, page_size=2)
+    assert state.completed_at is not None
+    # U2 and U3 were not created by the import
+    assert state.imported == 3
+    assert User.select().count() == 5
+
+    state = import_workspace_users(db, client, restart=True, page_size=2)
+    assert state.imported == 0
@@ -0,0 +1,26 @@
+import os
+import sys
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARKS_DIR)
+
+from db.models import MeetingParticipant  # noqa: E402
+from query_plans import check_query_plans, generate_meetings, hot_queries  # noqa: E402
+from workspace import generate_workspace  # noqa: E402
+
+
+def test_hot_queries_use_indexes(db):
+    generate_workspace(db, 200, 5)
+    generate_meetings(db, 20, 5)
+
+    plans = check_query_plans(db)
+    assert set(plans) == set(hot_queries("U1", 1, None))
+    for name, statements in plans.items():
+        assert statements, name
+        for statement in statements:
+            assert not statement["full_scans"], (name, statement["sql"], statement["plan"])
+            assert any("USING" in step for step in statement["plan"]), (name, statement["sql"], statement["plan"])
+
+    # The statements of the check are rolled back
+    assert not MeetingParticipant.select().where(MeetingParticipant.rsvp.is_null(False)).exists()
@@ -0,0 +1,85 @@
+import datetime
+from types import SimpleNamespace
+
+import pytz
+
+import rsvp
+from db.models import User, Meeting, MeetingParticipant
+from rsvp import RSVP_RENDER_TIMEOUT, answer_invitation, record_rsvp, update_organizer_message
+
+
+class FakeRuntime:
+    """ The runtime services update_message uses, recording the chat.update calls """
+
+    def __init__(self):
+        self.updates = []
+        self.profile_cache = SimpleNamespace(avatar_urls=lambda client, uids: {})
+        self.slack_api = SimpleNamespace(call=self.call)
+
+    def call(self, client, method, **kwargs):
+        self.updates.append((method, kwargs["channel"]))
+
+
+def create_meeting(n_participants=3):
+    users = [User.create(slack_uid=f"U{i}") for i in range(n_participants)]
+    start = pytz.utc.localize(datetime.datetime(2026, 6, 10, 9))
+    meeting = Meeting.create(epoch=0, title="Sync", meeting_start=start, meeting_end=start + datetime.timedelta(hours=1),
+                             frequency="0", organizer=users[0])
+    for user in users:
+        MeetingParticipant.create(user=user, meeting=meeting, delivery_status="sent",
+                                  dm_channel=f"D{user.slack_uid}", message_ts="1")
+    return meeting
+
+
+def responder(responses, uid):
+    return lambda **kwargs: responses.append(uid)
+
+
+def test_the_first_answer_of_a_burst_claims_the_organizer_update(db):
+    meeting = create_meeting()
+    runtime = FakeRuntime()
+
+    participant, organizer = record_rsvp(meeting.id, "U1", "yes")
+    assert organizer.user.slack_uid == "U0"
+    # Shown by the claimed update, which has not run yet
+    assert record_rsvp(meeting.id, "U2", "no")[1] is None
+
+    update_organizer_message(runtime, None, organizer)
+    assert runtime.updates == [("chat_update", "DU0")]
+    assert Meeting.get_by_id(meeting.id).rsvp_render_at is None
+    # The next answer starts another burst
+    assert record_rsvp(meeting.id, "U2", "maybe")[1] is not None
+
+
+def test_an_expired_claim_is_taken_over(db):
+    meeting = create_meeting()
+    record_rsvp(meeting.id, "U1", "yes")
+    Meeting.update(rsvp_render_at=datetime.datetime.utcnow() - RSVP_RENDER_TIMEOUT * 2).execute()
+
+    assert record_rsvp(meeting.id, "U2", "yes")[1] is not None
+
+
+def test_the_organizer_answer_does_not_claim(db):
+    meeting = create_meeting()
+    participant, organizer = record_rsvp(meeting.id, "U0", "yes")
+    assert participant.user.slack_uid == "U0" and organizer is None
+    assert record_rsvp(meeting.id, "UNKNOWN", "yes") == (None, None)
+
+
+def test_answer_invitation(db, monkeypatch):
+    monkeypatch.setattr(rsvp, "RSVP_RENDER_DELAY", 0)
+    meeting = create_meeting()
+    runtime = FakeRuntime()
+    responses = []
+
+    # A burst: the second answer comes in while the first waits to update the organizer
+    record_rsvp(meeting.id, "U2", "no")
+    assert answer_invitation(runtime, None, meeting.id, "U1", "maybe", responder(responses, "U1")).rsvp == "maybe"
+    assert responses == ["U1"]
+    assert runtime.updates == []
+
+    Meeting.update(rsvp_render_at=None).execute()
+    answer_invitation(runtime, None, meeting.id, "U1", "yes", responder(responses, "U1"))
+    assert responses == ["U1", "U1"]
+    assert runtime.updates == [("chat_update", "DU0")]
+    assert answer_invitation(runtime, None, meeting.id, "UNKNOWN", "yes", responder(responses, "UNKNOWN")) is None
@@ -0,0 +1,171 @@
+"""
+The bitmap engine against a slot by slot reference of the same rules: a slot counts as working
+time if it lies within the working hours of a workday, and a TimeSlot covers every slot it
+overlaps. TimeSlots marked available add to the working hours, tentative ones only allow a
+participant, unavailable ones remove them.
+"""
+import datetime
+
+import pytz
+
+from db.models import User, UserProfile, TimeSlot
+from scheduling.bitmap import SLOT_SECONDS, SLOTS_PER_DAY
+from scheduling.suggestions import CANDIDATE_STEP_SLOTS, load_participant_availability, rank_time_slots
+
+SLOT = datetime.timedelta(seconds=SLOT_SECONDS)
+
+
+def create_profile(uid, timezone, workdays, start, end, slots=()):
+    user = User.create(slack_uid=uid)
+    profile = UserProfile(user=user, timezone=timezone, workdays=0,
+                          working_hours_start=datetime.datetime.strptime(start, "%H:%M"),
+                          working_hours_end=datetime.datetime.strptime(end, "%H:%M"))
+    profile.update_workdays(workdays)
+    profile.save()
+    for slot_start, slot_end, status in slots:
+        TimeSlot.create(user=user, type="availability", start=slot_start, end=slot_end, status_label=status)
+    return profile
+
+
+def reference_availability(profile, slots, window_start, n_slots):
+    """ (available, tentative) slot sets of a participant, checked one slot at a time """
+    tz = pytz.timezone(profile.timezone)
+    start_time = profile.working_hours_start.time()
+    end_time = profile.working_hours_end.time()
+
+    shifts = []
+    first_day = window_start.astimezone(tz).date() - datetime.timedelta(days=1)
+    for d in range(n_slots // SLOTS_PER_DAY + 3):
+        day = first_day + datetime.timedelta(days=d)
+        if not profile.workdays & (1 << day.weekday()):
+            continue
+        end_day = day + datetime.timedelta(days=1) if end_time <= start_time else day
+        shifts.append((tz.localize(datetime.datetime.combine(day, start_time)),
+                       tz.localize(datetime.datetime.combine(end_day, end_time))))
+
+    def overlapping(t, status):
+        return any(s < t + SLOT and e > t for s, e, label in slots if label == status)
+
+    available = set()
+    tentative = set()
+    for i in range(n_slots):
+        t = window_start + i * SLOT
+        if overlapping(t, "unavailable"):
+            continue
+        if overlapping(t, "tentative"):
+            tentative.add(i)
+        elif overlapping(t, "available") or any(s <= t and t + SLOT <= e for s, e in shifts):
+            available.add(i)
+    return available, tentative
+
+
+def slot_set(bitmap):
+    return {i for i in range(bitmap.bit_length()) if bitmap >> i & 1}
+
+
+def reference_ranking(availability, n_slots, length, limit):
+    scored = []
+    for start in range(0, n_slots - length + 1, CANDIDATE_STEP_SLOTS):
+        meeting = set(range(start, start + length))
+        n_available = sum(meeting <= available for available, _ in availability)
+        n_soft = sum(meeting <= available | tentative for available, tentative in availability)
+        if n_soft:
+            scored.append((-n_available, -(n_soft - n_available), start))
+    return [start for _, _, start in sorted(scored)[:limit]]
+
+
+def check_against_reference(profiles_and_slots, window_start, n_slots=SLOTS_PER_DAY,
+                            duration=datetime.timedelta(minutes=30)):
+    uids = [profile.user.slack_uid for profile, _ in profiles_and_slots]
+    participants = load_participant_availability(uids, window_start, n_slots)
+
+    expected = [reference_availability(profile, slots, window_start, n_slots) for profile, slots in profiles_and_slots]
+    for participant, (available, tentative) in zip(participants, expected):
+        assert slot_set(participant.available) == available, participant.slack_uid
+        assert slot_set(participant.tentative) == tentative, participant.slack_uid
+
+    length = int(duration.total_seconds() // SLOT_SECONDS)
+    ranked = rank_time_slots(participants, window_start, duration, pytz.utc, n_slots=n_slots, limit=10)
+    assert [int((s.start_time - window_start).total_seconds() // SLOT_SECONDS) for s in ranked] \
+        == reference_ranking(expected, n_slots, length, limit=10)
+    return participants, ranked
+
+
+def test_day_window(db):
+    utc = pytz.utc
+    day = datetime.date(2026, 6, 10)  # Wednesday
+    at = lambda h, m=0: utc.localize(datetime.datetime.combine(day, datetime.time(h, m)))  # noqa: E731
+    slots_a = [(at(10), at(11), "unavailable"), (at(14, 2), at(14, 33), "tentative")]
+    slots_b = [(at(19), at(20, 30), "available")]
+    a = create_profile("UA", "UTC", 1 | 2 | 4 | 8 | 16, "09:00", "17:00", slots_a)
+    b = create_profile("UB", "Europe/Paris", 4, "10:30", "18:15", slots_b)
+    c = create_profile("UC", "UTC", 32 | 64, "09:00", "17:00")  # weekends only
+
+    window_start = utc.localize(datetime.datetime.combine(day, datetime.time()))
+    participants, ranked = check_against_reference([(a, slots_a), (b, slots_b), (c, [])], window_start)
+    assert participants[2].available == 0
+    # Both workday participants are in from 9:00 UTC (10:30 Paris is 8:30 UTC)
+    assert ranked[0].start_time == at(9)
+    assert ranked[0].available_users == ["UA", "UB"]
+    assert ranked[0].unavailable_users == ["UC"]
+
+
+def test_unknown_participant_is_never_available(db):
+    window_start = pytz.utc.localize(datetime.datetime(2026, 6, 10))
+    participants = load_participant_availability(["UNKNOWN"], window_start)
+    assert participants[0].available == 0
+    assert slot_set(participants[0].tentative) == set(range(SLOTS_PER_DAY))
+
+
+def test_overnight_hours_across_midnight(db):
+    tz = pytz.timezone("Asia/Tokyo")
+    day = datetime.date(2026, 6, 12)  # Friday
+    at = lambda d, h, m=0: tz.localize(datetime.datetime.combine(d, datetime.time(h, m)))  # noqa: E731
+    saturday = day + datetime.timedelta(days=1)
+    # Night shift Thursday and Friday, running into the next morning
+    slots = [(at(day, 23, 30), at(saturday, 1), "unavailable")]
+    night = create_profile("UN", "Asia/Tokyo", 8 | 16, "22:00", "06:00", slots)
+    day_shift = create_profile("UD", "Asia/Tokyo", 16 | 32, "05:00", "08:00")
+
+    # Two days in Tokyo time, from Friday 00:00
+    window_start = at(day, 0).astimezone(pytz.utc)
+    participants, _ = check_against_reference([(night, slots), (day_shift, [])], window_start,
+                                              n_slots=2 * SLOTS_PER_DAY)
+    available = slot_set(participants[0].available)
+    # Thursday's shift runs into Friday 06:00, Friday's from 22:00 into Saturday, less 23:30-01:00
+    assert 0 in available and (6 * 60) // 5 - 1 in available and (6 * 60) // 5 not in available
+    assert (22 * 60) // 5 in available and (23 * 60 + 30) // 5 not in available and (25 * 60) // 5 in available
+
+
+def test_dst_start(db):
+    tz = pytz.timezone("America/Los_Angeles")
+    day = datetime.date(2026, 3, 8)  # clocks go from 02:00 to 03:00
+    at = lambda h, m=0: tz.localize(datetime.datetime.combine(day, datetime.time(h, m)))  # noqa: E731
+    slots = [(at(12), at(13), "unavailable")]
+    early = create_profile("UE", "America/Los_Angeles", 64, "01:00", "05:00", slots)
+    office = create_profile("UO", "America/Los_Angeles", 64, "09:00", "17:00")
+    abroad = create_profile("UL", "Europe/London", 64, "16:00", "23:30")
+
+    # The organizer's day in Los Angeles, 23 hours long
+    window_start = at(0).astimezone(pytz.utc)
+    participants, _ = check_against_reference(
+        [(early, slots), (office, []), (abroad, [])], window_start, n_slots=23 * 12)
+    # 01:00-05:00 local is three hours that day
+    assert len(slot_set(participants[0].available)) == 3 * 12
+    # 09:00 PDT is eight hours after midnight PST
+    assert min(slot_set(participants[1].available)) == 8 * 12
+
+
+def test_dst_end(db):
+    tz = pytz.timezone("America/New_York")
+    day = datetime.date(2026, 11, 1)  # clocks go from 02:00 back to 01:00
+    early = create_profile("UE", "America/New_York", 64, "00:30", "04:00")
+    office = create_profile("UO", "America/New_York", 64, "09:00", "17:00")
+    paris = create_profile("UP", "Europe/Paris", 64 | 1, "08:00", "20:00")
+
+    window_start = tz.localize(datetime.datetime.combine(day, datetime.time())).astimezone(pytz.utc)
+    participants, _ = check_against_reference(
+        [(early, []), (office, []), (paris, [])], window_start, n_slots=25 * 12)
+    # 00:30-04:00 local is four and a half hours that day
+    assert len(slot_set(participants[0].available)) == 4 * 12 + 6
+    assert min(slot_set(participants[1].available)) == 10 * 12
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+import timezones
+from timezones import TimezoneCatalogue, next_offset_change
+
+
+def test_next_offset_change_is_the_earliest_dst_transition():
+    # Cuba at midnight, then New York at 2am, move their clocks on March 8
+    assert next_offset_change(datetime(2026, 2, 20, 12, tzinfo=pytz.utc)) == \
+        datetime(2026, 3, 8, 5, tzinfo=pytz.utc)
+    assert next_offset_change(pytz.timezone("America/New_York").localize(datetime(2026, 3, 8, 1, 59))) == \
+        datetime(2026, 3, 8, 7, tzinfo=pytz.utc)
+
+
+def test_fixed_offset_zones_have_no_transition(monkeypatch):
+    monkeypatch.setattr(timezones.pytz, "common_timezones", ["UTC", "Asia/Kolkata", "Etc/GMT+5"])
+    assert next_offset_change(datetime(2026, 2, 20, tzinfo=pytz.utc)) is None
+
+    catalogue = TimezoneCatalogue(max_age=timedelta(hours=12))
+    now = datetime(2026, 2, 20, tzinfo=pytz.utc)
+    catalogue.build(now)
+    assert catalogue._valid_until is None
+    assert catalogue._expires_at == now + timedelta(hours=12)
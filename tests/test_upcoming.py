@@ -0,0 +1,79 @@
+import datetime
+import json
+import logging
+from types import SimpleNamespace
+
+import pytz
+
+from db.models import User, Meeting, MeetingParticipant, UpcomingMeeting
+from listeners import cancel, reschedule
+from upcoming import project_meeting, upcoming_meetings
+
+logger = logging.getLogger(__name__)
+
+
+class FakeRuntime:
+    """ The runtime services of the reschedule and cancel paths, recording the chat.update calls """
+
+    def __init__(self):
+        self.updates = []
+        self.profile_cache = SimpleNamespace(avatar_urls=lambda client, uids: {})
+        self.slack_api = SimpleNamespace(call=self.call)
+
+    def call(self, client, method, **kwargs):
+        self.updates.append((method, kwargs["channel"], kwargs["text"]))
+
+
+def create_meeting(n_participants=3):
+    users = [User.get_or_create(slack_uid=f"U{i}")[0] for i in range(n_participants)]
+    start = pytz.utc.localize(datetime.datetime.utcnow().replace(second=0, microsecond=0) + datetime.timedelta(days=1))
+    meeting = Meeting.create(epoch=int(start.timestamp()), title="Sync", meeting_start=start,
+                             meeting_end=start + datetime.timedelta(hours=1), frequency="0", organizer=users[0])
+    for user in users:
+        MeetingParticipant.create(user=user, meeting=meeting, delivery_status="sent",
+                                  dm_channel=f"D{user.slack_uid}", message_ts="1")
+    project_meeting(meeting, "U0")
+    return meeting
+
+
+def reschedule_body(uid, meeting, start):
+    values = {"b": {"meeting_create_meeting_time_suggestion_suggest_select": {
+        "type": "radio_buttons", "selected_option": {"value": str(int(start.timestamp()))}}}}
+    return {"user": {"id": uid},
+            "view": {"state": {"values": values}, "private_metadata": json.dumps({"meeting_id": meeting.id})}}
+
+
+def test_reschedule_moves_the_home_tab_rows(db):
+    meeting = create_meeting()
+    runtime = FakeRuntime()
+    start = pytz.utc.localize(datetime.datetime.utcnow().replace(second=0, microsecond=0) + datetime.timedelta(days=3))
+
+    # Only the organizer moves the meeting
+    reschedule(runtime, None, reschedule_body("U1", meeting, start), logger)
+    assert runtime.updates == []
+
+    reschedule(runtime, None, reschedule_body("U0", meeting, start), logger)
+    meeting = Meeting.get_by_id(meeting.id)
+    assert meeting.meeting_start == start
+    assert meeting.meeting_end - meeting.meeting_start == datetime.timedelta(hours=1)
+    for uid in ("U0", "U1", "U2"):
+        shown, = upcoming_meetings(uid)
+        assert (shown.meeting_start, shown.meeting_end) == (meeting.meeting_start, meeting.meeting_end)
+    assert sorted(channel for _, channel, _ in runtime.updates) == ["DU0", "DU1", "DU2"]
+
+
+def test_cancel_removes_the_home_tab_rows(db):
+    meeting = create_meeting()
+    other = create_meeting()
+    runtime = FakeRuntime()
+
+    cancel(runtime, None, meeting.id, "U1", logger)
+    assert Meeting.get_or_none(Meeting.id == meeting.id) is not None
+    assert runtime.updates == []
+
+    cancel(runtime, None, meeting.id, "U0", logger)
+    assert Meeting.get_or_none(Meeting.id == meeting.id) is None
+    assert not UpcomingMeeting.select().where(UpcomingMeeting.meeting == meeting.id).exists()
+    assert not MeetingParticipant.select().where(MeetingParticipant.meeting == meeting.id).exists()
+    assert [m.meeting_id for m in upcoming_meetings("U1")] == [other.id]
+    assert sorted(runtime.updates) == [("chat_update", f"DU{i}", "<@U0> cancelled Sync") for i in range(3)]